@@ -1,94 +1,51 @@
 #!/usr/bin/env python3
 import threading
+import time
 from kivy.clock import Clock
 from kivy.lang import Builder
 from kivy.core.window import Window
-from kivy.animation import Animation
-from kivy.uix.relativelayout import RelativeLayout
-from kivy.uix.label import Label
-from kivy.properties import StringProperty, NumericProperty, ListProperty
 
 from kivymd.app import MDApp
-from kivymd.uix.list import OneLineListItem
-from kivymd.uix.snackbar import Snackbar
+from kivymd.uix.list import OneLineListItem, TwoLineListItem
 
 # Import your Spotify functions
 from spotify_controller import (
-    get_current_playback,
-    toggle_playback,
-    previous_song,
-    next_song,
-    toggle_like_current_song,
-    is_track_liked,
-    toggle_shuffle,
-    toggle_loop
+    get_queue,
+    change_volume,
+    set_volume,
+    toggle_track_in_playlist
 )
-from spotify_controller import get_library, play_context_by_url, sp
+from spotify_controller import context_uri, sp
+from catalog_search import CatalogSearch
+from track_pages import TrackPageCache
+from queue_view import QueueTracker, queue_rows, apply_row_diff
+from playlist_index import PlaylistMembershipIndex
+from ui_core import PlayerPageMixin, LibraryMixin, OverlayStack, load_kv
+from snapshot_poller import POLL_INTERVAL
+from power_save import IdleManager, Backlight, IDLE_FPS, IDLE_POLL_INTERVAL
+import hardware_input
+from alsa_volume import open_volume_backend
+import spotifyd_supervisor
+from ring_log import get_logger, setup_logging
+
+log = get_logger(__name__)
 
 # Set the initial window size to 240x320px
 Window.size = (240, 320)
 Window.clearcolor = (0, 0, 0, 1)
 
-# -----------------------------------
-# MarqueeLabel Implementation
-# -----------------------------------
-class MarqueeLabel(RelativeLayout):
-    text = StringProperty("")
-    font_size = NumericProperty("20sp")
-    text_color = ListProperty([0, 1, 0, 1])
-    delay = NumericProperty(2)  # seconds before starting marquee
-    speed = NumericProperty(30) # pixels per second
-
-    def __init__(self, **kwargs):
-        super(MarqueeLabel, self).__init__(**kwargs)
-        self.label = Label(text=self.text,
-                           font_size=self.font_size,
-                           color=self.text_color,
-                           size_hint=(None, None))
-        self.add_widget(self.label)
-        self.bind(text=self._update_label,
-                  font_size=self._update_label,
-                  text_color=self._update_label,
-                  size=self._update_label)
-        Clock.schedule_once(self._start_marquee, self.delay)
-
-    def _update_label(self, *args):
-        self.label.text = self.text
-        self.label.font_size = self.font_size
-        self.label.color = self.text_color
-        self.label.texture_update()
-        self.label.width = self.label.texture_size[0]
-        self.label.height = self.height
-        self.label.x = self.width
-        Clock.unschedule(self._marquee_update)
-        if self.label.width > self.width:
-            Clock.schedule_interval(self._marquee_update, 1/30.0)
-        else:
-            self.label.x = (self.width - self.label.width) / 2
-
-    def on_size(self, *args):
-        self._update_label()
-
-    def _start_marquee(self, dt):
-        if self.label.width > self.width:
-            Clock.schedule_interval(self._marquee_update, 1/30.0)
-
-    def _marquee_update(self, dt):
-        self.label.x -= self.speed * dt
-        if self.label.x < -self.label.width:
-            self.label.x = self.width
+# Seconds to wait for a selection to start playing before its
+# time-to-first-audio is no longer measured
+START_TIMEOUT = 30
 
 # -----------------------------------
 # KV Layout String
 # -----------------------------------
 KV = '''
 #:import dp kivy.metrics.dp
-#:import MarqueeLabel __main__.MarqueeLabel
 
-<LibraryOverlay@BoxLayout>:
+<SearchOverlay@BoxLayout>:
     orientation: "vertical"
-    size_hint: None, None
-    size: root.parent.width, root.parent.height
     canvas.before:
         Color:
             rgba: 0, 0, 0, 1
@@ -96,7 +53,7 @@ KV = '''
             pos: self.pos
             size: self.size
     MDLabel:
-        text: "Your Library"
+        text: "Search Spotify"
         halign: "center"
         font_style: "Subtitle1"
         theme_text_color: "Custom"
@@ -104,103 +61,131 @@ KV = '''
         size_hint_y: None
         height: dp(20)
         padding: dp(2), dp(2)
+    MDTextField:
+        id: search_field
+        hint_text: "Songs, albums, artists"
+        size_hint_y: None
+        height: dp(30)
+        font_size: "12sp"
+        on_text: app.on_catalog_query(self.text)
     ScrollView:
         MDList:
-            id: library_list
+            id: search_results
 
-<PlaySongPage@BoxLayout>:
+<TrackListOverlay@BoxLayout>:
     orientation: "vertical"
-    padding: dp(10)
-    spacing: dp(5)
-    MDBoxLayout:
-        orientation: "vertical"
-        size_hint_y: 0.8
-        spacing: dp(5)
-        MDCard:
-            size_hint: None, None
-            size: root.width * 0.5, root.width * 0.5
-            pos_hint: {"center_x": 0.5}
-            elevation: 10
-            radius: [dp(25),]
-            AsyncImage:
-                id: album_cover
-                source: ""
-                allow_stretch: True
-                keep_ratio: True
-        MarqueeLabel:
-            id: song_title
-            text: "Song Title"
-            font_size: "18sp"
-            size_hint_y: None
-            height: dp(25)
-        MarqueeLabel:
-            id: song_artist
-            text: "Artist"
-            font_size: "14sp"
+    canvas.before:
+        Color:
+            rgba: 0, 0, 0, 1
+        Rectangle:
+            pos: self.pos
+            size: self.size
+    MDLabel:
+        id: track_list_title
+        text: ""
+        halign: "center"
+        font_style: "Subtitle1"
+        theme_text_color: "Custom"
+        text_color: 0, 1, 0, 1
+        size_hint_y: None
+        height: dp(20)
+        padding: dp(2), dp(2)
+    ScrollView:
+        id: track_scroll
+        on_scroll_y: app.on_track_list_scroll(self.scroll_y)
+        MDList:
+            id: track_list
+
+<QueueOverlay@BoxLayout>:
+    orientation: "vertical"
+    canvas.before:
+        Color:
+            rgba: 0, 0, 0, 1
+        Rectangle:
+            pos: self.pos
+            size: self.size
+    MDLabel:
+        text: "Up Next"
+        halign: "center"
+        font_style: "Subtitle1"
+        theme_text_color: "Custom"
+        text_color: 0, 1, 0, 1
+        size_hint_y: None
+        height: dp(20)
+        padding: dp(2), dp(2)
+    RecycleView:
+        id: queue_view
+        viewclass: "TwoLineListItem"
+        RecycleBoxLayout:
+            orientation: "vertical"
+            default_size: None, dp(56)
+            default_size_hint: 1, None
             size_hint_y: None
-            height: dp(20)
-        RelativeLayout:
+            height: self.minimum_height
+
+<DiagnosticsOverlay@BoxLayout>:
+    orientation: "vertical"
+    canvas.before:
+        Color:
+            rgba: 0, 0, 0, 1
+        Rectangle:
+            pos: self.pos
+            size: self.size
+    MDLabel:
+        text: "Diagnostics"
+        halign: "center"
+        font_style: "Subtitle1"
+        theme_text_color: "Custom"
+        text_color: 0, 1, 0, 1
+        size_hint_y: None
+        height: dp(20)
+        padding: dp(2), dp(2)
+    RecycleView:
+        id: log_view
+        viewclass: "TwoLineListItem"
+        RecycleBoxLayout:
+            orientation: "vertical"
+            default_size: None, dp(56)
+            default_size_hint: 1, None
             size_hint_y: None
-            height: dp(40)
-            MDProgressBar:
-                id: progress_bar
-                pos_hint: {"center_y": 0.5}
-                size_hint_x: 1
-                value: 0
-                max: 100
-                color: 0, 1, 0, 1
-            MDFloatingActionButton:
-                id: like_button
-                icon: "heart-outline"
-                md_bg_color: 0, 1, 0, 1
-                size_hint: None, None
-                size: root.width * 0.09, root.width * 0.09
-                pos_hint: {"right": 1, "center_y": 0.5}
-                on_release: app.on_toggle_like()
-    MDBoxLayout:
-        orientation: "horizontal"
+            height: self.minimum_height
+
+<PlaylistRow@OneLineIconListItem>:
+    playlist_id: ""
+    icon: "checkbox-blank-outline"
+    on_release: app.on_playlist_row_select(self.playlist_id)
+    IconLeftWidget:
+        icon: root.icon
+        theme_text_color: "Custom"
+        text_color: 0, 1, 0, 1
+
+<PlaylistOverlay@BoxLayout>:
+    orientation: "vertical"
+    canvas.before:
+        Color:
+            rgba: 0, 0, 0, 1
+        Rectangle:
+            pos: self.pos
+            size: self.size
+    MDLabel:
+        text: "In Playlists"
+        halign: "center"
+        font_style: "Subtitle1"
+        theme_text_color: "Custom"
+        text_color: 0, 1, 0, 1
         size_hint_y: None
-        height: root.width * 0.12
-        size_hint_x: None
-        width: self.minimum_width
-        pos_hint: {"center_x": 0.5}
-        spacing: dp(5)
-        padding: dp(5)
-        MDFloatingActionButton:
-            id: shuffle_button
-            icon: "shuffle"
-            md_bg_color: 0, 1, 0, 1
-            size_hint: None, None
-            size: root.width * 0.10, root.width * 0.10
-            on_release: app.on_toggle_shuffle()
-        MDFloatingActionButton:
-            id: previous_button
-            icon: "skip-previous"
-            md_bg_color: 0, 1, 0, 1
-            size_hint: None, None
-            size: root.width * 0.10, root.width * 0.10
-            on_release: app.on_previous()
-        MDFloatingActionButton:
-            id: play_pause_button
-            icon: "play"
-            md_bg_color: 0, 1, 0, 1
-            size_hint: None, None
-            size: root.width * 0.10, root.width * 0.10
-            on_release: app.on_play_pause()
-        MDFloatingActionButton:
-            id: next_button
-            icon: "skip-next"
-            md_bg_color: 0, 1, 0, 1
-            size_hint: None, None
-            size: root.width * 0.10, root.width * 0.10
-            on_release: app.on_next()
-        MDFloatingActionButton:
-            id: loop_button
-            icon: "repeat"
-            md_bg_color: 0, 1, 0, 1
-            size_hint: None, None
-            size: root.width * 0.10, root.width * 0.10
-            on_release: app.on_toggle_loop()
+        height: dp(20)
+        padding: dp(2), dp(2)
+    RecycleView:
+        id: playlist_view
+        viewclass: "PlaylistRow"
+        RecycleBoxLayout:
+            orientation: "vertical"
+            default_size: None, dp(48)
+            default_size_hint: 1, None
+            size_hint_y: None
+            height: self.minimum_height
+
 
 Screen:
     RelativeLayout:
@@ -208,208 +193,459 @@ Screen:
         PlaySongPage:
             id: play_song_page
             pos: 0, 0
-        LibraryOverlay:
-            id: library_overlay
-            pos: -self.width, 0
 '''
 
 # -----------------------------------
 # Main Application Class
 # -----------------------------------
-class CombinedSpotifyGUI(MDApp):
+class CombinedSpotifyGUI(PlayerPageMixin, LibraryMixin, MDApp):
     def build(self):
         self.theme_cls.theme_style = "Dark"
         self.theme_cls.primary_palette = "Green"
+        self.log_buffer = setup_logging()
+        self.log_version = None  # buffer version the diagnostics list shows
+        self.log_last_entry = None  # newest entry the diagnostics list shows
+        self.card_elevation = 0 if load_kv() else 10
         self.root = Builder.load_string(KV)
-        # Cache library data at startup
-        try:
-            self.cached_playlists, self.cached_albums = get_library(sp)
-        except Exception as e:
-            print("Error retrieving library:", e)
-            self.cached_playlists, self.cached_albums = {}, {}
-        Window.bind(on_key_down=self.on_key_down)
-        Clock.schedule_interval(self.update_play_song_ui, 1)
+        # Everything but the player page is built the first time it is shown.
+        self.overlays = OverlayStack(self.root.ids.main_layout, on_create=self.on_overlay_created)
+        # The playlist index is refreshed by every library sync, the first
+        # of which start_library() runs in the background right away.
+        self.playlist_index = PlaylistMembershipIndex(sp)
+        self.playlist_index_refreshing = threading.Lock()
+        self.start_library()
+        self.track_pages = TrackPageCache(sp)
+        self.track_context = None
+        self.pending_start = None  # selection waiting for its first audio
+        self.queue_tracker = QueueTracker()
+        self.queue_loading = False
+        self.catalog_search = CatalogSearch(
+            sp,
+            on_results=lambda query, rows: Clock.schedule_once(
+                lambda dt: self.show_catalog_results(query, rows), 0),
+            on_error=lambda query, e: Clock.schedule_once(
+                lambda dt: self.show_snackbar(f"Search failed: {e}"), 0),
+        )
+        self.backlight = Backlight()
+        self.idle_manager = IdleManager(on_idle=self.enter_power_save,
+                                        on_wake=self.exit_power_save)
+        Window.bind(on_key_down=self.on_key_down,
+                    on_touch_down=self.on_user_touch)
+        self.start_player(self.root.ids.play_song_page)
+        self.start_hardware_input()
+        self.spotifyd = None
+        if spotifyd_supervisor.SUPERVISE:
+            self.spotifyd = spotifyd_supervisor.SpotifydSupervisor(
+                on_ready=lambda device_id: Clock.schedule_once(
+                    lambda dt: self.show_snackbar(
+                        f"{spotifyd_supervisor.DEVICE_NAME} is ready"), 0),
+                on_down=lambda reason: Clock.schedule_once(
+                    lambda dt: self.show_snackbar(
+                        f"{spotifyd_supervisor.DEVICE_NAME} restarting: {reason}"), 0),
+            )
+            self.spotifyd.start()
         return self.root
 
-    def on_key_down(self, window, key, scancode, codepoint, modifiers):
-        if key == 13:  # Enter key
-            self.toggle_library_overlay()
-        return False
+    def on_stop(self):
+        if self.spotifyd is not None:
+            self.spotifyd.stop()
 
-    def toggle_library_overlay(self):
-        overlay = self.root.ids.library_overlay
-        if overlay.x < 0:
-            self.populate_library_list()
-            Animation.cancel_all(overlay)
-            anim = Animation(x=0, duration=0.3)
-            anim.start(overlay)
+    def start_hardware_input(self):
+        if hardware_input.evdev is None:
+            log.info("python-evdev not available; physical buttons disabled.")
+            return
+        # Input arrives on the evdev thread; run every action on the main thread.
+        def on_main_thread(action):
+            return lambda: Clock.schedule_once(lambda dt: action(), 0)
+        actions = {
+            "play_pause": self.on_play_pause,
+            "next": self.on_next,
+            "previous": self.on_previous,
+            "like": self.on_toggle_like,
+            "library": self.toggle_library_overlay,
+        }
+        # Prefer the local mixer; Spotify is told about the new volume lazily.
+        self.alsa_volume = open_volume_backend(sync=set_volume)
+        if self.alsa_volume is not None:
+            volume_callback, volume_interval = self.alsa_volume.change, 0
         else:
-            Animation.cancel_all(overlay)
-            anim = Animation(x=-overlay.width, duration=0.3)
-            anim.start(overlay)
-
-    def populate_library_list(self):
-        lib_list = self.root.ids.library_overlay.ids.library_list
-        lib_list.clear_widgets()
-        header = self._create_header("Playlists")
-        lib_list.add_widget(header)
-        for url, name in self.cached_playlists.items():
-            item = OneLineListItem(
-                text=name,
-                on_release=lambda inst, url=url: self.on_library_item_select(url)
-            )
-            lib_list.add_widget(item)
-        header = self._create_header("Albums")
-        lib_list.add_widget(header)
-        for url, name in self.cached_albums.items():
-            item = OneLineListItem(
-                text=name,
-                on_release=lambda inst, url=url: self.on_library_item_select(url)
-            )
-            item.theme_text_color = "Custom"
-            item.text_color = (0, 1, 0, 1)
-            lib_list.add_widget(item)
-
-    def _create_header(self, text):
-        from kivymd.uix.label import MDLabel
-        return MDLabel(
-            text=text,
-            halign="center",
-            theme_text_color="Custom",
-            text_color=(0, 1, 0, 1),
-            bold=True,
-            size_hint_y=None,
-            height=20,
-            padding=(5, 5)
-        )
-
-    def on_library_item_select(self, url):
-        threading.Thread(target=self._play_context_thread, args=(url,)).start()
-        overlay = self.root.ids.library_overlay
-        Animation.cancel_all(overlay)
-        anim = Animation(x=-overlay.width, duration=0.3)
-        anim.start(overlay)
-
-    def _play_context_thread(self, url):
+            volume_callback, volume_interval = change_volume, hardware_input.VOLUME_INTERVAL
         try:
-            result = play_context_by_url(sp, url)
-        except Exception as e:
-            result = f"Error: {str(e)}"
-        Clock.schedule_once(lambda dt: self.show_snackbar(result), 0)
-
-    def update_play_song_ui(self, dt):
+            self.hardware_input = hardware_input.HardwareInput(
+                {name: on_main_thread(action) for name, action in actions.items()},
+                volume_callback,
+                on_input=self._on_hardware_input,
+                volume_interval=volume_interval,
+            )
+        except OSError as e:
+            log.error("Error opening input devices: %s", e)
+            return
+        self.hardware_input.start()
+
+    def _on_hardware_input(self):
+        # A press that only wakes a blanked screen should not also act.
+        blanked = self.backlight.blanked
+        Clock.schedule_once(lambda dt: self._wake_on_input(), 0)
+        return blanked
+
+    def _sync_library_thread(self):
+        details = super()._sync_library_thread()
+        if details is not None:
+            self._refresh_playlist_index_thread(details)
+
+    def _refresh_playlist_index_thread(self, details):
+        # A sync that overlaps a slow refresh leaves it to the running one.
+        if not self.playlist_index_refreshing.acquire(blocking=False):
+            return
+        # Only playlists whose snapshot_id changed are fetched again.
         try:
-            current = get_current_playback()
+            self.playlist_index.refresh(details)
         except Exception as e:
-            print(f"Error fetching playback: {e}")
+            log.error("Error refreshing playlist index: %s", e)
             return
+        finally:
+            self.playlist_index_refreshing.release()
+        Clock.schedule_once(lambda dt: self._refresh_visible_playlist_rows(), 0)
+
+    # -----------------------------------
+    # Power save
+    # -----------------------------------
+    def _wake_on_input(self):
+        """Register input; True if it only served to wake a blanked screen."""
+        blanked = self.backlight.blanked
+        return self.idle_manager.input_event() and blanked
+
+    def on_user_touch(self, window, touch):
+        return self._wake_on_input()
+
+    def enter_power_save(self):
+        # Kivy only exposes maxfps through Config at startup, so adjust the
+        # clock's frame cap directly.
+        self._active_max_fps = Clock._max_fps
+        Clock._max_fps = IDLE_FPS
+        psp = self.player_page
+        psp.ids.song_title.frozen = True
+        psp.ids.song_artist.frozen = True
+        self.poller.set_interval(IDLE_POLL_INTERVAL)
+        self.backlight.blank()
+
+    def exit_power_save(self):
+        Clock._max_fps = self._active_max_fps
+        psp = self.player_page
+        psp.ids.song_title.frozen = False
+        psp.ids.song_artist.frozen = False
+        self.backlight.restore()
+        self.poller.set_interval(POLL_INTERVAL)
+        self.poller.poll_now()
 
-        psp = self.root.ids.play_song_page
-        if current and current.get("item"):
-            item = current["item"]
-            current_track_id = item.get("id")
-            if not hasattr(self, 'current_track_id') or self.current_track_id != current_track_id:
-                self.current_track_id = current_track_id
-                album_images = item.get("album", {}).get("images", [])
-                if album_images:
-                    cover_url = album_images[0]["url"]
-                    psp.ids.album_cover.source = cover_url
-                    psp.ids.album_cover.reload()
-                else:
-                    psp.ids.album_cover.source = ""
-            psp.ids.song_title.text = item.get("name", "Unknown Title")
-            artists = item.get("artists", [])
-            psp.ids.song_artist.text = ", ".join([a["name"] for a in artists])
-            duration_ms = item.get("duration_ms", 1)
-            progress_ms = current.get("progress_ms", 0)
-            percentage = (progress_ms / duration_ms) * 100
-            psp.ids.progress_bar.value = percentage
-            if current.get("is_playing"):
-                psp.ids.play_pause_button.icon = "pause"
-            else:
-                psp.ids.play_pause_button.icon = "play"
-            song_id = item.get("id")
-            if song_id:
-                try:
-                    liked = is_track_liked(song_id)
-                    psp.ids.like_button.icon = "heart" if liked else "heart-outline"
-                except Exception as e:
-                    print(f"Error checking liked status: {e}")
-            repeat_state = current.get("repeat_state", "off")
-            if repeat_state != "off":
-                psp.ids.loop_button.icon = "repeat-variant"
-            else:
-                psp.ids.loop_button.icon = "repeat"
-            shuffle_state = current.get("shuffle_state", False)
-            if shuffle_state:
-                psp.ids.shuffle_button.icon = "shuffle-variant"
-            else:
-                psp.ids.shuffle_button.icon = "shuffle"
-        else:
-            psp.ids.song_title.text = "No song is playing"
-            psp.ids.song_artist.text = ""
-            psp.ids.album_cover.source = ""
-            psp.ids.progress_bar.value = 0
-            psp.ids.play_pause_button.icon = "play"
-            psp.ids.loop_button.icon = "repeat"
-            psp.ids.shuffle_button.icon = "shuffle"
-
-    def show_snackbar(self, message):
-        Snackbar(text=message, duration=3).open()
+    def on_key_down(self, window, key, scancode, codepoint, modifiers):
+        if self._wake_on_input():
+            return True
+        if key == 13:  # Enter key
+            search = self.overlays.peek("SearchOverlay")
+            if self.overlays.shown("TrackListOverlay"):
+                self.close_track_list()
+            elif search is None or not search.ids.search_field.focus:
+                self.toggle_library_overlay()
+        elif key == 9:  # Tab key
+            self.toggle_search_overlay()
+        elif key == 273:  # Up arrow
+            self.toggle_queue_overlay()
+        elif key == 274:  # Down arrow
+            self.toggle_diagnostics_overlay()
+        elif key == 275:  # Right arrow
+            self.toggle_playlist_overlay()
+        return False
 
-    def on_play_pause(self):
-        threading.Thread(target=self._play_pause_thread).start()
+    def toggle_queue_overlay(self):
+        if not self.overlays.shown("QueueOverlay"):
+            if self.queue_tracker.stale:
+                self.refresh_queue()
+            self.overlays.show("QueueOverlay")
+        else:
+            self.overlays.hide("QueueOverlay")
 
-    def _play_pause_thread(self):
+    def toggle_playlist_overlay(self):
+        if not self.overlays.shown("PlaylistOverlay"):
+            self.refresh_playlist_rows()
+            self.overlays.show("PlaylistOverlay")
+        else:
+            self.overlays.hide("PlaylistOverlay")
+
+    def refresh_playlist_rows(self):
+        """Mark the playlists holding the current track, from the local index."""
+        track_id = getattr(self, "current_track_id", None)
+        members = self.playlist_index.playlists_for(track_id) if track_id else set()
+        rows = [{"text": name, "playlist_id": playlist_id,
+                 "icon": "checkbox-marked" if playlist_id in members else "checkbox-blank-outline"}
+                for playlist_id, name in self.playlist_index.editable_playlists()]
+        apply_row_diff(self.overlays.get("PlaylistOverlay").ids.playlist_view.data, rows)
+
+    def on_playlist_row_select(self, playlist_id):
+        track_id = getattr(self, "current_track_id", None)
+        threading.Thread(target=self._toggle_playlist_thread,
+                         args=(playlist_id, track_id)).start()
+
+    def _toggle_playlist_thread(self, playlist_id, track_id):
+        snapshot_id = None
         try:
-            toggle_playback()
+            result, snapshot_id = toggle_track_in_playlist(self.playlist_index, playlist_id,
+                                                           track_id)
         except Exception as e:
-            print(f"Error toggling playback: {e}")
-
-    def on_previous(self):
-        threading.Thread(target=self._previous_thread).start()
+            log.error("Error editing playlist: %s", e)
+            result = f"Error: {e}"
+        if snapshot_id is not None:
+            # Pages cached before the edit no longer match the playlist.
+            self.track_pages.invalidate("playlist", playlist_id)
+            Clock.schedule_once(
+                lambda dt: self._set_playlist_snapshot(playlist_id, snapshot_id), 0)
+        Clock.schedule_once(lambda dt: self.show_snackbar(result), 0)
+        Clock.schedule_once(lambda dt: self._refresh_visible_playlist_rows(), 0)
 
-    def _previous_thread(self):
-        try:
-            previous_song()
-        except Exception as e:
-            print(f"Error going to previous song: {e}")
+    def _set_playlist_snapshot(self, playlist_id, snapshot_id):
+        for details in self.library_details.values():
+            if details["type"] == "playlist" and details["id"] == playlist_id:
+                details["snapshot_id"] = snapshot_id
 
-    def on_next(self):
-        threading.Thread(target=self._next_thread).start()
+    def _refresh_visible_playlist_rows(self):
+        if self.overlays.shown("PlaylistOverlay"):
+            self.refresh_playlist_rows()
 
-    def _next_thread(self):
-        try:
-            next_song()
-        except Exception as e:
-            print(f"Error going to next song: {e}")
+    def toggle_diagnostics_overlay(self):
+        if not self.overlays.shown("DiagnosticsOverlay"):
+            self.refresh_diagnostics()
+            self.overlays.show("DiagnosticsOverlay")
+        else:
+            self.overlays.hide("DiagnosticsOverlay")
 
-    def on_toggle_like(self):
-        threading.Thread(target=self._toggle_like_thread).start()
+    def refresh_diagnostics(self):
+        if self.log_buffer.version == self.log_version:
+            return
+        self.log_version = self.log_buffer.version
+        entries = self.log_buffer.entries()
+        # Oldest first, so a new entry appends a row instead of shifting them all.
+        rows = []
+        for entry in entries:
+            details = f"{time.strftime('%H:%M:%S', time.localtime(entry.last_time))} " \
+                      f"{entry.level} {entry.source}"
+            if entry.count > 1:
+                details += f" (x{entry.count})"
+            rows.append({"text": entry.message, "secondary_text": details})
+        log_view = self.overlays.get("DiagnosticsOverlay").ids.log_view
+        # Follow new entries, but leave the view alone while the user reads
+        # older ones and only repeat counts change.
+        at_bottom = log_view.scroll_y <= 0
+        appended = bool(entries) and entries[-1] is not self.log_last_entry
+        self.log_last_entry = entries[-1] if entries else None
+        apply_row_diff(log_view.data, rows)
+        if at_bottom or appended:
+            log_view.scroll_y = 0
+
+    def refresh_queue(self):
+        if self.queue_loading:
+            return
+        self.queue_loading = True
+        self.queue_tracker.stale = False
+        threading.Thread(target=self._refresh_queue_thread, daemon=True).start()
 
-    def _toggle_like_thread(self):
+    def _refresh_queue_thread(self):
         try:
-            toggle_like_current_song()
+            rows = queue_rows(get_queue())
         except Exception as e:
-            print(f"Error toggling like status: {e}")
+            log.error("Error fetching queue: %s", e)
+            self.queue_tracker.stale = True
+            rows = None
+        Clock.schedule_once(lambda dt: self._apply_queue_rows(rows), 0)
+
+    def _apply_queue_rows(self, rows):
+        self.queue_loading = False
+        if rows is not None:
+            # Only rows that differ from what is shown are rebound and redrawn.
+            apply_row_diff(self.overlays.get("QueueOverlay").ids.queue_view.data, rows)
+            # The track changed while this fetch was in flight. A failed fetch
+            # is not retried here, so an outage does not turn into a tight loop.
+            if self.queue_tracker.stale and self.overlays.shown("QueueOverlay"):
+                self.refresh_queue()
+
+    def toggle_search_overlay(self):
+        overlay = self.overlays.get("SearchOverlay")
+        if not self.overlays.shown("SearchOverlay"):
+            self.overlays.show("SearchOverlay")
+            overlay.ids.search_field.focus = True
+        else:
+            overlay.ids.search_field.focus = False
+            self.catalog_search.cancel()
+            self.overlays.hide("SearchOverlay")
+
+    def on_catalog_query(self, text):
+        self.catalog_search.submit(text)
+        if not text.strip():
+            self.overlays.get("SearchOverlay").ids.search_results.clear_widgets()
+
+    def show_catalog_results(self, query, rows):
+        overlay = self.overlays.get("SearchOverlay")
+        # Results for a query the user has since edited are stale.
+        if query != overlay.ids.search_field.text:
+            return
+        results = overlay.ids.search_results
+        results.clear_widgets()
+        if not rows:
+            results.add_widget(self._create_header("No results"))
+            return
+        for row in rows:
+            subtitle = f"{row['kind'].title()} - {row['subtitle']}" if row["subtitle"] \
+                else row["kind"].title()
+            item = TwoLineListItem(
+                text=row["name"],
+                secondary_text=subtitle,
+                on_release=lambda inst, row=row: self.on_catalog_item_select(row)
+            )
+            results.add_widget(item)
+
+    def on_catalog_item_select(self, row):
+        self.play_context(row["url"], row["offset"])
+        self.toggle_search_overlay()
 
-    def on_toggle_shuffle(self):
-        threading.Thread(target=self._toggle_shuffle_thread).start()
+    def on_library_item_select(self, url):
+        details = self.library_details.get(url)
+        if details is None:
+            # Not a library playlist/album (e.g. an artist): play it directly.
+            self.play_context(url)
+            self.overlays.hide("LibraryOverlay")
+            return
+        self.open_track_list(url, details)
+
+    # -----------------------------------
+    # Track list drill-down
+    # -----------------------------------
+    def open_track_list(self, url, details):
+        overlay = self.overlays.get("TrackListOverlay")
+        name = self.cached_playlists.get(url) or self.cached_albums.get(url, "")
+        overlay.ids.track_list_title.text = name
+        overlay.ids.track_scroll.scroll_y = 1
+        track_list = overlay.ids.track_list
+        track_list.clear_widgets()
+        track_list.add_widget(OneLineListItem(
+            text="Play all",
+            on_release=lambda inst: self.on_track_select(url, None)
+        ))
+        self.track_context = {
+            "url": url,
+            "details": details,
+            "next_page": 0,
+            "page_count": None,
+            "loading": False,
+        }
+        self.overlays.show("TrackListOverlay")
+        self.load_next_track_page()
+
+    def close_track_list(self):
+        self.track_context = None
+        self.overlays.hide("TrackListOverlay")
+
+    def on_track_list_scroll(self, scroll_y):
+        # Fetch the next page as the user nears the bottom of the list.
+        if scroll_y <= 0.1:
+            self.load_next_track_page()
+
+    def load_next_track_page(self):
+        context = self.track_context
+        if context is None or context["loading"]:
+            return
+        if context["page_count"] is not None and context["next_page"] >= context["page_count"]:
+            return
+        context["loading"] = True
+        threading.Thread(target=self._load_track_page_thread, args=(context,),
+                         daemon=True).start()
 
-    def _toggle_shuffle_thread(self):
+    def _load_track_page_thread(self, context):
+        details = context["details"]
+        page = context["next_page"]
         try:
-            toggle_shuffle()
+            tracks, total = self.track_pages.get_page(
+                details["type"], details["id"], page, details.get("snapshot_id"))
         except Exception as e:
-            print(f"Error toggling shuffle: {e}")
+            log.error("Error loading tracks: %s", e)
+            context["loading"] = False
+            return
+        self.library_index.add_tracks(context["url"], tracks)
+        Clock.schedule_once(lambda dt: self._append_track_page(context, page, tracks, total), 0)
 
-    def on_toggle_loop(self):
-        threading.Thread(target=self._toggle_loop_thread).start()
+    def _append_track_page(self, context, page, tracks, total):
+        context["loading"] = False
+        if context is not self.track_context:
+            return
+        context["next_page"] = page + 1
+        context["page_count"] = self.track_pages.page_count(total)
+        track_list = self.overlays.get("TrackListOverlay").ids.track_list
+        first_position = page * self.track_pages.page_size
+        for position, track in enumerate(tracks, start=first_position):
+            if not track:
+                continue
+            artists = ", ".join(a["name"] for a in track.get("artists", []))
+            item = TwoLineListItem(
+                text=track.get("name", "Unknown"),
+                secondary_text=artists,
+                on_release=lambda inst, pos=position: self.on_track_select(
+                    context["url"], {"position": pos})
+            )
+            track_list.add_widget(item)
+
+    def on_track_select(self, url, offset):
+        self.play_context(url, offset)
+        self.close_track_list()
+        self.overlays.hide("LibraryOverlay")
+
+    def _play_context_thread(self, url, offset=None):
+        uri = (self.library_details.get(url) or {}).get("uri") or context_uri(url)
+        self.pending_start = {"uri": uri, "requested": time.monotonic()}
+        super()._play_context_thread(url, offset)
+
+    # -----------------------------------
+    # Playback snapshots (from the poller, on the main thread)
+    # -----------------------------------
+    def on_playback_snapshot(self, current, liked):
+        self.idle_manager.observe_playback(current)
+        self._measure_first_audio(current)
+
+        # The queue only changes with the track or context, so refetch it
+        # on those transitions instead of polling it.
+        if self.queue_tracker.observe(current) and self.overlays.shown("QueueOverlay"):
+            self.refresh_queue()
+
+        if self.apply_playback(current, liked):
+            self._refresh_visible_playlist_rows()
+        if self.overlays.shown("DiagnosticsOverlay"):
+            self.refresh_diagnostics()
+
+    def on_playback_error(self, error):
+        # Errors from an outage still show up while it lasts.
+        if self.overlays.shown("DiagnosticsOverlay"):
+            self.refresh_diagnostics()
+
+    def _measure_first_audio(self, current):
+        """Report how long the pending selection took to become audible."""
+        pending = self.pending_start
+        if pending is None:
+            return
+        elapsed = time.monotonic() - pending["requested"]
+        if elapsed > START_TIMEOUT:
+            self.pending_start = None
+            return
+        if not current or not current.get("is_playing"):
+            return
+        if (current.get("context") or {}).get("uri") != pending["uri"]:
+            return
+        progress = current.get("progress_ms", 0) / 1000
+        if progress > elapsed:
+            # Still the earlier playback of the same context.
+            return
+        self.pending_start = None
+        # Audio began `progress` seconds before this snapshot was taken.
+        first_audio = elapsed - progress
+        log.info("Time to first audio for %s: %.2fs", pending["uri"], first_audio)
+        self.show_snackbar(f"Started in {first_audio:.1f}s")
 
-    def _toggle_loop_thread(self):
-        try:
-            toggle_loop()
-        except Exception as e:
-            print(f"Error toggling loop: {e}")
 
 if __name__ == '__main__':
     CombinedSpotifyGUI().run()
@@ -0,0 +1,101 @@
+import os
+import threading
+
+try:
+    import alsaaudio
+except ImportError:  # pyalsaaudio not installed (e.g. on a desktop)
+    alsaaudio = None
+
+from ring_log import get_logger
+
+log = get_logger(__name__)
+
+# "auto" uses the ALSA mixer when it can be opened and the Web API otherwise;
+# "alsa" and "webapi" force one or the other.
+VOLUME_BACKEND = os.getenv("FLUX_VOLUME_BACKEND", "auto")
+# Mixer spotifyd plays through. For ALSA's dummy card (modprobe snd-dummy)
+# use FLUX_ALSA_DEVICE=hw:Dummy and FLUX_ALSA_CONTROL=Master.
+ALSA_DEVICE = os.getenv("FLUX_ALSA_DEVICE", "default")
+ALSA_CONTROL = os.getenv("FLUX_ALSA_CONTROL", "PCM")
+# Seconds of knob silence before the new volume is reported to Spotify.
+SYNC_DELAY = float(os.getenv("FLUX_VOLUME_SYNC_DELAY", "2"))
+
+
+class AlsaVolume:
+    """
+    Volume control through the local ALSA mixer.
+
+    Setting the mixer is an in-process ioctl, so a knob turn is audible
+    within a frame instead of after a Web API round-trip to Spotify and back
+    to spotifyd. The new value is reported to Spotify once the knob has been
+    still for `sync_delay` seconds, so other Connect clients catch up without
+    the device waiting on them.
+
+    spotifyd should drive the same control with volume_controller =
+    "alsa_linear" so that both sides agree on what a percentage means.
+
+    Args:
+        sync: Called with the final volume percentage after the knob settles.
+        device: ALSA mixer device, e.g. "default" or "hw:Dummy".
+        control: Mixer control name, e.g. "PCM" or "Master".
+        sync_delay: Seconds of inactivity before sync() is called.
+    """
+
+    def __init__(self, sync=None, device=ALSA_DEVICE, control=ALSA_CONTROL,
+                 sync_delay=SYNC_DELAY):
+        if alsaaudio is None:
+            raise RuntimeError("pyalsaaudio is not installed")
+        self.mixer = alsaaudio.Mixer(control=control, device=device)
+        self.sync = sync
+        self.sync_delay = sync_delay
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def get(self):
+        """Current mixer volume in percent, averaged over channels."""
+        # Re-read so changes made by spotifyd (e.g. from a phone) are seen.
+        self.mixer.handleevents()
+        channels = self.mixer.getvolume()
+        return round(sum(channels) / len(channels)) if channels else 0
+
+    def set(self, volume):
+        volume = max(0, min(100, int(volume)))
+        self.mixer.setvolume(volume)
+        self._schedule_sync(volume)
+        return volume
+
+    def change(self, delta):
+        """Adjust the volume by `delta` percentage points."""
+        return self.set(self.get() + delta)
+
+    def _schedule_sync(self, volume):
+        if self.sync is None:
+            return
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.sync_delay, self._sync, args=(volume,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _sync(self, volume):
+        try:
+            self.sync(volume)
+        except Exception as e:
+            log.error("Error syncing volume to Spotify: %s", e)
+
+
+def open_volume_backend(sync=None):
+    """
+    Return an AlsaVolume according to FLUX_VOLUME_BACKEND, or None when the
+    Web API should be used instead.
+    """
+    if VOLUME_BACKEND == "webapi":
+        return None
+    try:
+        return AlsaVolume(sync)
+    except Exception as e:
+        if VOLUME_BACKEND == "alsa":
+            raise
+        log.info("ALSA mixer unavailable, using Web API volume: %s", e)
+        return None
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Headless rendering benchmark for the player and library screens.
+
+Each scenario runs CombinedSpotifyGUI in its own process with synthetic
+playback snapshots and libraries (no network), uncapped frame rate, and
+reports frame-time percentiles, widget count, texture updates and peak RSS:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json      # compare against it
+
+Without a display, SDL's offscreen driver is used; if your SDL build lacks
+it, run under xvfb-run instead.
+"""
+import argparse
+import functools
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    "player": {"library_size": 10, "screen": "player"},
+    "library_10": {"library_size": 10, "screen": "library"},
+    "library_1k": {"library_size": 1000, "screen": "library"},
+    "library_10k": {"library_size": 10000, "screen": "library"},
+    "grid_10k": {"library_size": 10000, "screen": "grid"},
+}
+DURATION = 6  # seconds of frames recorded per scenario
+WARMUP_FRAMES = 5
+MIN_FRAMES = 20  # recorded after warmup, however long they take
+
+
+# -----------------------------------
+# Synthetic data
+# -----------------------------------
+def synthetic_library(size):
+    playlists = {f"https://open.spotify.com/playlist/bench{i}": f"Playlist number {i}"
+                 for i in range(size // 2)}
+    albums = {f"https://open.spotify.com/album/bench{i}": f"Album title {i}"
+              for i in range(size - size // 2)}
+    return playlists, albums
+
+
+class SyntheticPlayback:
+    """Playback snapshots that advance like a real session: progress every
+    poll, a new track (alternating short and marquee-length titles) every
+    few polls."""
+
+    def __init__(self, polls_per_track=3):
+        self.polls = 0
+        self.polls_per_track = polls_per_track
+
+    def __call__(self):
+        track = self.polls // self.polls_per_track
+        self.polls += 1
+        title = f"Track {track}" if track % 2 else \
+            f"A much longer track title number {track} that has to scroll"
+        return {
+            "is_playing": True,
+            "progress_ms": (self.polls % self.polls_per_track) * 1000,
+            "shuffle_state": track % 3 == 0,
+            "repeat_state": "off",
+            "context": {"uri": "spotify:playlist:bench0"},
+            "device": {"id": "bench", "volume_percent": 50},
+            "item": {
+                "id": f"track{track}",
+                "name": title,
+                "duration_ms": 180000,
+                "artists": [{"name": f"Artist {track}"}],
+                "album": {"images": []},
+            },
+        }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+# -----------------------------------
+# Scenario runner (child process)
+# -----------------------------------
+def run_scenario(name):
+    config = SCENARIOS[name]
+    # Must be set before Kivy and spotify_controller are imported.
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+    if not os.getenv("DISPLAY") and not os.getenv("WAYLAND_DISPLAY"):
+        os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")
+    for key in ("SPOTIPY_CLIENT_ID", "SPOTIPY_CLIENT_SECRET"):
+        os.environ.setdefault(key, "benchmark")
+    os.environ.setdefault("SPOTIPY_REDIRECT_URI", "http://localhost:8888/callback")
+    os.environ["FLUX_SPOTIFYD_SUPERVISE"] = "0"
+    os.environ["FLUX_VOLUME_BACKEND"] = "webapi"
+
+    from kivy.config import Config
+    Config.set("graphics", "maxfps", "0")
+    from kivy.clock import Clock
+    from kivy.core.window import Window
+    from kivy.uix.image import Image
+    from kivy.uix.label import Label
+    import GUI
+    import snapshot_poller
+    import ui_core
+
+    # Count texture (re)builds; every one is a CPU render plus a GPU upload.
+    counters = {"texture_updates": 0}
+    for cls in (Label, Image):
+        original = cls.texture_update
+
+        # Keep the name: Kivy's WeakMethod looks callbacks up by name.
+        @functools.wraps(original)
+        def counted(self, *args, _original=original):
+            counters["texture_updates"] += 1
+            return _original(self, *args)
+        cls.texture_update = counted
+
+    library = synthetic_library(config["library_size"])
+    ui_core.get_library = lambda sp, details=None: (dict(library[0]), dict(library[1]))
+    snapshot_poller.get_current_playback = SyntheticPlayback()
+    snapshot_poller.is_track_liked = lambda track_id: track_id.endswith("0")
+    GUI.get_queue = lambda: {"queue": []}
+
+    results = {}
+    flips = []
+
+    class BenchmarkGUI(GUI.CombinedSpotifyGUI):
+        def start_hardware_input(self):
+            pass
+
+        def sync_library(self, dt):
+            pass
+
+        def on_start(self):
+            Window.bind(on_flip=lambda *args: flips.append(time.perf_counter()))
+            # Load the library up front rather than in the background.
+            self.library_index.update_library(*library)
+            self._apply_library_sync(dict(library[0]), dict(library[1]), {})
+            screen = config["screen"]
+            if screen in ("library", "grid"):
+                if screen == "grid":
+                    self.grid_mode = True
+                    overlay = self.overlays.get("LibraryOverlay")
+                    overlay.remove_widget(overlay.ids.library_scroll)
+                    overlay.add_widget(self.library_grid)
+                    self.cover_cache = ui_core.CoverCache()
+                started = time.perf_counter()
+                self.toggle_library_overlay()
+                results["populate_ms"] = (time.perf_counter() - started) * 1000
+                Clock.schedule_once(lambda dt: self._scroll_library(), 0.5)
+            Clock.schedule_once(lambda dt: self._finish(), DURATION)
+
+        def _scroll_library(self):
+            from kivy.animation import Animation
+            overlay = self.overlays.get("LibraryOverlay")
+            scroll = self.library_grid if self.grid_mode else overlay.ids.library_scroll
+            Animation(scroll_y=0, duration=DURATION - 2).start(scroll)
+
+        def _finish(self):
+            # Slow layouts can use up the whole duration in a handful of frames.
+            if len(flips) < WARMUP_FRAMES + MIN_FRAMES:
+                Clock.schedule_once(lambda dt: self._finish(), 0.5)
+                return
+            intervals = [(b - a) * 1000 for a, b in zip(flips, flips[1:])][WARMUP_FRAMES:]
+            results.update({
+                "frames": len(intervals),
+                "frame_ms": {
+                    "p50": percentile(intervals, 0.50),
+                    "p90": percentile(intervals, 0.90),
+                    "p99": percentile(intervals, 0.99),
+                    "max": max(intervals, default=0.0),
+                },
+                "widgets": sum(1 for _ in self.root.walk()),
+                "texture_updates": counters["texture_updates"],
+            })
+            self.stop()
+
+    BenchmarkGUI().run()
+    # ru_maxrss is in kilobytes on Linux.
+    results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+# -----------------------------------
+# Driver
+# -----------------------------------
+def run_all(names):
+    results = {}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--scenario", name],
+                              capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        if proc.returncode != 0:
+            print(proc.stderr, file=sys.stderr)
+            raise SystemExit(f"Scenario {name} failed")
+        results[name] = json.loads(proc.stdout.strip().splitlines()[-1])
+    return results
+
+
+def _flatten(result, prefix=""):
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(baseline, current):
+    """Print every metric next to its baseline value and relative change."""
+    for name, result in current.items():
+        print(name)
+        old = _flatten(baseline.get(name, {}))
+        for metric, value in _flatten(result).items():
+            line = f"  {metric:<22}{value:>12.2f}"
+            if metric in old:
+                before = old[metric]
+                change = (value - before) / before * 100 if before else 0.0
+                line += f"{before:>12.2f}  {change:+6.1f}%"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Flux rendering benchmark")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS),
+                        help="run one scenario in this process and print JSON")
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS),
+                        help="subset of scenarios to run")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare results against this JSON file")
+    args = parser.parse_args()
+
+    if args.scenario:
+        print(json.dumps(run_scenario(args.scenario)))
+        return
+
+    results = run_all(args.only or list(SCENARIOS))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(json.load(f), results)
+    else:
+        compare({}, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Pre-render the player control icons into a single Kivy texture atlas.
+
+Run once at build/install time (and again after changing the icon set or
+size); the flat theme (FLUX_THEME=flat) then draws every control from
+assets/icons.atlas without touching the icon font at runtime.
+"""
+import argparse
+import json
+import math
+import os
+
+from PIL import Image, ImageDraw, ImageFont
+from kivymd import fonts_path
+from kivymd.icon_definitions import md_icons
+
+from theme import ASSETS_DIR, ICON_ATLAS, CONTROL_ICONS
+
+ICON_FONT = os.path.join(fonts_path, "materialdesignicons-webfont.ttf")
+BUTTON_COLOR = (0, 255, 0, 255)
+GLYPH_COLOR = (0, 0, 0, 255)
+PADDING = 2
+
+
+def render_icon(name, size):
+    """A flat green disc with the black glyph centred on it."""
+    image = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((0, 0, size - 1, size - 1), fill=BUTTON_COLOR)
+    font = ImageFont.truetype(ICON_FONT, int(size * 0.6))
+    draw.text((size / 2, size / 2), md_icons[name], font=font, fill=GLYPH_COLOR, anchor="mm")
+    return image
+
+
+def build_atlas(size):
+    cell = size + 2 * PADDING
+    columns = math.ceil(math.sqrt(len(CONTROL_ICONS)))
+    rows = math.ceil(len(CONTROL_ICONS) / columns)
+    sheet = Image.new("RGBA", (columns * cell, rows * cell), (0, 0, 0, 0))
+    regions = {}
+    for index, name in enumerate(CONTROL_ICONS):
+        left = (index % columns) * cell + PADDING
+        top = (index // columns) * cell + PADDING
+        sheet.paste(render_icon(name, size), (left, top))
+        # Kivy atlas coordinates start at the bottom-left corner.
+        regions[name] = [left, sheet.height - top - size, size, size]
+
+    os.makedirs(ASSETS_DIR, exist_ok=True)
+    image_name = os.path.basename(ICON_ATLAS) + "-0.png"
+    sheet.save(os.path.join(ASSETS_DIR, image_name))
+    with open(ICON_ATLAS + ".atlas", "w") as f:
+        json.dump({image_name: regions}, f)
+    return ICON_ATLAS + ".atlas"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the flat theme icon atlas")
+    parser.add_argument("--size", type=int, default=64,
+                        help="icon size in pixels; at least the on-screen button size")
+    args = parser.parse_args()
+    print(f"Wrote {build_atlas(args.size)}")
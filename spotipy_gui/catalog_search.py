@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+
+from search_index import normalize
+
+SEARCH_TYPES = "track,album,playlist,artist"
+
+
+def parse_search_results(response):
+    """
+    Flatten an sp.search response into rows the GUI can list directly.
+
+    Each row is a dict with "name", "subtitle", "kind", "url" and "offset".
+    "url" and "offset" are the arguments for play_context_by_url: tracks play
+    inside their album starting at the track itself, everything else plays
+    as its own context.
+    """
+    rows = []
+    for track in (response.get("tracks") or {}).get("items", []):
+        if not track:
+            continue
+        album_url = track.get("album", {}).get("external_urls", {}).get("spotify")
+        if album_url and track.get("uri"):
+            rows.append({
+                "name": track.get("name", "Unknown"),
+                "subtitle": ", ".join(a["name"] for a in track.get("artists", [])),
+                "kind": "track",
+                "url": album_url,
+                "offset": {"uri": track["uri"]},
+            })
+    for kind in ("album", "playlist", "artist"):
+        for item in (response.get(kind + "s") or {}).get("items", []):
+            # The API returns null placeholders for unavailable playlists.
+            if not item:
+                continue
+            url = item.get("external_urls", {}).get("spotify")
+            if not url:
+                continue
+            if kind == "album":
+                subtitle = ", ".join(a["name"] for a in item.get("artists", []))
+            elif kind == "playlist":
+                subtitle = (item.get("owner") or {}).get("display_name") or ""
+            else:
+                subtitle = ""
+            rows.append({
+                "name": item.get("name", "Unknown"),
+                "subtitle": subtitle,
+                "kind": kind,
+                "url": url,
+                "offset": None,
+            })
+    return rows
+
+
+class CatalogSearch:
+    """
+    Debounced catalog search against sp.search.
+
+    submit() can be called on every keystroke: the request only goes out once
+    typing has paused for `delay` seconds, results of queries that have been
+    superseded in the meantime are dropped, and repeated queries are answered
+    from an LRU cache keyed by the normalized query text.
+
+    Args:
+        sp: An authenticated Spotipy client instance.
+        on_results: Called as on_results(query, rows) from a worker thread.
+        on_error: Called as on_error(query, exception) from a worker thread.
+        delay: Debounce delay in seconds.
+        cache_size: Number of normalized queries to keep results for.
+        limit: Results per type requested from the API.
+    """
+
+    def __init__(self, sp, on_results, on_error=None, delay=0.4, cache_size=64, limit=10):
+        self.sp = sp
+        self.on_results = on_results
+        self.on_error = on_error
+        self.delay = delay
+        self.cache_size = cache_size
+        self.limit = limit
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._timer = None
+        self._generation = 0
+
+    def submit(self, query):
+        """Schedule a search for `query`, superseding any earlier one."""
+        key = normalize(query)
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not key:
+                return
+            rows = self._cache_get(key)
+            if rows is None:
+                self._timer = threading.Timer(self.delay, self._run, args=(generation, query, key))
+                self._timer.daemon = True
+                self._timer.start()
+                return
+        self.on_results(query, rows)
+
+    def cancel(self):
+        """Drop the pending query and ignore any request still in flight."""
+        with self._lock:
+            self._generation += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _run(self, generation, query, key):
+        if not self._is_current(generation):
+            return
+        try:
+            response = self.sp.search(q=query, limit=self.limit, type=SEARCH_TYPES)
+            rows = parse_search_results(response)
+        except Exception as e:
+            if self.on_error and self._is_current(generation):
+                self.on_error(query, e)
+            return
+        with self._lock:
+            self._cache_put(key, rows)
+            if generation != self._generation:
+                # A newer query was typed while this one was in flight.
+                return
+        self.on_results(query, rows)
+
+    def _is_current(self, generation):
+        with self._lock:
+            return generation == self._generation
+
+    def _cache_get(self, key):
+        rows = self._cache.get(key)
+        if rows is not None:
+            self._cache.move_to_end(key)
+        return rows
+
+    def _cache_put(self, key, rows):
+        self._cache[key] = rows
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -0,0 +1,152 @@
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+import urllib.request
+
+from ring_log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "flux", "covers")
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+class CoverCache:
+    """
+    Disk-backed cover art cache with a small prioritized download pool.
+
+    Images are stored under `cache_dir` named by the SHA-1 of their URL, so a
+    cover that was downloaded once never touches the network again, even
+    across restarts. Downloads are served lowest priority first by `workers`
+    threads; set_wanted() re-prioritizes the queue as the user scrolls and
+    drops requests that are no longer wanted before they start.
+
+    Args:
+        cache_dir: Directory for cached images (created if missing).
+        workers: Number of concurrent downloads.
+        max_bytes: Disk budget; the oldest files are pruned to stay under it
+            when the cache is created.
+    """
+
+    def __init__(self, cache_dir=None, workers=2, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or os.getenv("FLUX_COVER_CACHE", DEFAULT_CACHE_DIR)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.prune(max_bytes)
+        self._cond = threading.Condition()
+        self._heap = []
+        # url -> heap entry [priority, seq, url, callback, cancelled, on_error]
+        self._pending = {}
+        self._seq = itertools.count()
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def path_for(self, url):
+        """Return the local path of a cached cover, or None if not cached."""
+        path = self._path(url)
+        if os.path.exists(path):
+            return path
+        return None
+
+    def fetch(self, url):
+        """Return the local path of a cover, downloading it synchronously if needed."""
+        return self.path_for(url) or self._download(url)
+
+    def request(self, url, callback, priority=0, on_error=None):
+        """
+        Queue a download; callback(url, path) is called from a worker thread
+        once the file is on disk, or on_error(url, exception) if the download
+        fails. Re-requesting a pending URL updates its priority.
+        """
+        with self._cond:
+            self._push(url, callback, priority, on_error)
+            self._cond.notify()
+
+    def set_wanted(self, urls, callback):
+        """
+        Make `urls` (nearest to the viewport first) the only pending
+        downloads. Pending requests not in `urls` are cancelled; cached
+        covers are skipped, so callers should check path_for() first.
+        """
+        wanted = set(urls)
+        with self._cond:
+            for url in [u for u in self._pending if u not in wanted]:
+                self._pending.pop(url)[4] = True
+            for priority, url in enumerate(urls):
+                if os.path.exists(self._path(url)):
+                    continue
+                self._push(url, callback, priority)
+            # Scrolling leaves many cancelled entries behind; drop them.
+            if len(self._heap) > 4 * len(self._pending) + 64:
+                self._heap = [entry for entry in self._heap if not entry[4]]
+                heapq.heapify(self._heap)
+            self._cond.notify_all()
+
+    def cancel_all(self):
+        with self._cond:
+            for entry in self._pending.values():
+                entry[4] = True
+            self._pending.clear()
+
+    def prune(self, max_bytes):
+        """Delete the oldest files until the cache fits `max_bytes`."""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def _push(self, url, callback, priority, on_error=None):
+        entry = self._pending.get(url)
+        if entry is not None:
+            if entry[0] == priority:
+                return
+            entry[4] = True
+        entry = [priority, next(self._seq), url, callback, False, on_error]
+        self._pending[url] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                entry = heapq.heappop(self._heap)
+                if entry[4]:
+                    continue
+                del self._pending[entry[2]]
+            url, callback, on_error = entry[2], entry[3], entry[5]
+            try:
+                path = self.fetch(url)
+            except Exception as e:
+                log.error("Error downloading cover: %s", e)
+                if on_error is not None:
+                    on_error(url, e)
+                continue
+            callback(url, path)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode()).hexdigest() + ".jpg")
+
+    def _download(self, url):
+        path = self._path(url)
+        with urllib.request.urlopen(url, timeout=10) as response:
+            data = response.read()
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,167 @@
+import os
+import select
+import threading
+import time
+
+try:
+    import evdev
+    from evdev import ecodes
+except ImportError:  # Not on Linux, or python-evdev not installed
+    evdev = None
+    ecodes = None
+
+from ring_log import get_logger
+
+log = get_logger(__name__)
+
+# Presses of the same button closer together than this are contact bounce.
+DEBOUNCE = float(os.getenv("FLUX_BUTTON_DEBOUNCE", "0.05"))
+# Minimum time between two volume requests; detents in between are summed.
+VOLUME_INTERVAL = float(os.getenv("FLUX_VOLUME_INTERVAL", "0.25"))
+# Volume change per encoder detent or volume key press, in percent.
+VOLUME_STEP = int(os.getenv("FLUX_VOLUME_STEP", "2"))
+# Comma-separated /dev/input/eventN paths. When unset, every device whose name
+# looks like a GPIO button or rotary encoder overlay is used.
+INPUT_DEVICES = os.getenv("FLUX_INPUT_DEVICES", "")
+
+# Key code name -> action name. Codes match what the gpio-key overlays in
+# /boot/config.txt are configured to emit.
+BUTTON_ACTIONS = {
+    "KEY_PLAYPAUSE": "play_pause",
+    "KEY_NEXTSONG": "next",
+    "KEY_PREVIOUSSONG": "previous",
+    "KEY_FAVORITES": "like",
+    "KEY_MENU": "library",
+    "KEY_ENTER": "library",
+}
+VOLUME_KEYS = {"KEY_VOLUMEUP": 1, "KEY_VOLUMEDOWN": -1}
+ENCODER_AXES = ("REL_X", "REL_DIAL", "REL_WHEEL")
+
+
+class VolumeCoalescer:
+    """
+    Collapses bursts of volume steps into rate-limited requests.
+
+    add() never blocks: steps accumulate, and a worker thread sends their sum
+    through apply(delta) at most once every `interval` seconds. A fast spin
+    of the knob therefore costs one request per interval instead of one per
+    detent, and the first step of a turn is still sent immediately.
+    """
+
+    def __init__(self, apply, interval=VOLUME_INTERVAL):
+        self.apply = apply
+        self.interval = interval
+        self._pending = 0
+        self._last_sent = 0
+        self._cond = threading.Condition()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def add(self, delta):
+        with self._cond:
+            self._pending += delta
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                wait_for = self._last_sent + self.interval - time.monotonic()
+                if wait_for > 0:
+                    self._cond.wait(wait_for)
+                    continue
+                delta, self._pending = self._pending, 0
+            try:
+                self.apply(delta)
+            except Exception as e:
+                log.error("Error changing volume: %s", e)
+            self._last_sent = time.monotonic()
+
+
+def find_input_devices():
+    """Return the evdev devices to listen to (see FLUX_INPUT_DEVICES)."""
+    if INPUT_DEVICES:
+        return [evdev.InputDevice(path.strip()) for path in INPUT_DEVICES.split(",")]
+    devices = []
+    for path in evdev.list_devices():
+        device = evdev.InputDevice(path)
+        name = device.name.lower()
+        if "gpio" in name or "rotary" in name or "button" in name:
+            devices.append(device)
+        else:
+            device.close()
+    return devices
+
+
+class HardwareInput:
+    """
+    Reads GPIO buttons and rotary encoders through evdev on a background
+    thread and maps them onto player actions.
+
+    Args:
+        actions: Dict mapping action names ("play_pause", "next", "previous",
+            "like", "library") to callables. They are called from the input
+            thread, so GUI callers should hop to the main thread themselves.
+        change_volume: Called with a volume delta in percent, at most once per
+            `volume_interval` seconds.
+        devices: evdev.InputDevice objects to read; defaults to
+            find_input_devices(). Tests can create an evdev.UInput virtual
+            device, pass evdev.InputDevice(ui.device.path) here and inject
+            events with ui.write()/ui.syn().
+        on_input: Optional callable run before any action, e.g. to wake the
+            screen. If it returns True the event is consumed.
+        volume_interval: Minimum seconds between volume changes. Local mixer
+            backends are cheap enough to use 0.
+    """
+
+    def __init__(self, actions, change_volume, devices=None, on_input=None,
+                 volume_interval=VOLUME_INTERVAL):
+        if evdev is None:
+            raise RuntimeError("python-evdev is not installed")
+        self.actions = actions
+        self.volume = VolumeCoalescer(change_volume, volume_interval)
+        self.devices = devices if devices is not None else find_input_devices()
+        self.on_input = on_input
+        self._last_press = {}  # key code -> time of the last accepted press
+        self._buttons = {ecodes.ecodes[name]: action for name, action in BUTTON_ACTIONS.items()}
+        self._volume_keys = {ecodes.ecodes[name]: step for name, step in VOLUME_KEYS.items()}
+        self._axes = {ecodes.ecodes[name] for name in ENCODER_AXES}
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        devices = {device.fd: device for device in self.devices}
+        while devices:
+            ready, _, _ = select.select(list(devices), [], [])
+            for fd in ready:
+                try:
+                    for event in devices[fd].read():
+                        self.handle_event(event)
+                except OSError as e:
+                    log.warning("Input device %s went away: %s", devices[fd].path, e)
+                    del devices[fd]
+
+    def handle_event(self, event):
+        if event.type == ecodes.EV_REL and event.code in self._axes:
+            if not self._consumed():
+                self.volume.add(event.value * VOLUME_STEP)
+        elif event.type == ecodes.EV_KEY:
+            if event.code in self._volume_keys:
+                # Held volume keys auto-repeat (value 2); treat repeats as steps.
+                if event.value in (1, 2) and not self._consumed():
+                    self.volume.add(self._volume_keys[event.code] * VOLUME_STEP)
+            elif event.code in self._buttons and event.value == 1:
+                if self._debounced(event.code) and not self._consumed():
+                    self.actions[self._buttons[event.code]]()
+
+    def _debounced(self, code):
+        now = time.monotonic()
+        last = self._last_press.get(code)
+        if last is not None and now - last < DEBOUNCE:
+            return False
+        self._last_press[code] = now
+        return True
+
+    def _consumed(self):
+        return bool(self.on_input and self.on_input())
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Lightweight player front-end that draws straight to a Linux framebuffer.
+
+Renders the same player page as GUI.py (cover art, title/artist marquee,
+progress bar, like and transport button state) with PIL into an offscreen
+image and writes only the regions that changed to the framebuffer, so it runs
+without Kivy, KivyMD or OpenGL. Any regular file can stand in for the device:
+
+    python lite_player.py --fb /tmp/fake_fb --size 160x128
+"""
+import argparse
+import os
+import threading
+import time
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from snapshot_poller import SnapshotPoller
+from cover_cache import CoverCache
+from ring_log import get_logger, setup_logging
+
+log = get_logger(__name__)
+
+GREEN = (0, 255, 0)
+DIM_GREEN = (0, 90, 0)
+BLACK = (0, 0, 0)
+
+MARQUEE_DELAY = 2  # seconds before a long title starts scrolling
+MARQUEE_SPEED = 30  # pixels per second
+MARQUEE_GAP = 40  # pixels between the end of the text and its next pass
+
+# Seconds before a failed cover download is retried; doubles per failure
+COVER_RETRY_INITIAL = 5
+COVER_RETRY_MAX = 120
+
+
+# -----------------------------------
+# Framebuffer
+# -----------------------------------
+# Lookup tables splitting 8-bit channels into the two bytes of RGB565.
+_R_HIGH = [v & 0xF8 for v in range(256)]
+_G_HIGH = [v >> 5 for v in range(256)]
+_G_LOW = [(v << 3) & 0xE0 for v in range(256)]
+_B_LOW = [v >> 3 for v in range(256)]
+
+
+def to_rgb565(image):
+    """Pack an RGB image as little-endian RGB565 bytes using only C-level PIL ops."""
+    r, g, b = image.split()
+    # The bit fields never overlap, so adding the bands is a bitwise OR.
+    high = ImageChops.add(r.point(_R_HIGH), g.point(_G_HIGH))
+    low = ImageChops.add(g.point(_G_LOW), b.point(_B_LOW))
+    return Image.merge("LA", (low, high)).tobytes()
+
+
+class Framebuffer:
+    """
+    A Linux framebuffer device (or a file standing in for one).
+
+    Geometry and depth are read from sysfs for /dev/fbN devices; for regular
+    files they must be given, and the file is created at the right size.
+    Supports 16 bpp (RGB565) and 32 bpp (BGRX) layouts.
+    """
+
+    def __init__(self, path, size=None, bpp=None):
+        self.path = path
+        name = os.path.basename(path)
+        sysfs = f"/sys/class/graphics/{name}"
+        if os.path.isdir(sysfs):
+            with open(f"{sysfs}/virtual_size") as f:
+                width, height = (int(v) for v in f.read().strip().split(","))
+            with open(f"{sysfs}/bits_per_pixel") as f:
+                bpp = int(f.read().strip())
+            with open(f"{sysfs}/stride") as f:
+                stride = int(f.read().strip())
+        else:
+            if size is None:
+                raise ValueError(f"{path} is not a framebuffer device; pass its size")
+            width, height = size
+            bpp = bpp or 16
+            stride = width * bpp // 8
+        if bpp not in (16, 32):
+            raise ValueError(f"Unsupported framebuffer depth: {bpp} bpp")
+        self.width, self.height = width, height
+        self.bpp = bpp
+        self.stride = stride
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT)
+        if not os.path.isdir(sysfs) and os.fstat(self.fd).st_size < stride * height:
+            os.ftruncate(self.fd, stride * height)
+
+    def write_region(self, image, box):
+        """Copy the `box` (left, top, right, bottom) of `image` to the screen."""
+        left, top, right, bottom = box
+        region = image.crop(box)
+        data = to_rgb565(region) if self.bpp == 16 else region.tobytes("raw", "BGRX")
+        row_bytes = (right - left) * self.bpp // 8
+        offset = top * self.stride + left * self.bpp // 8
+        for row in range(bottom - top):
+            os.pwrite(self.fd, data[row * row_bytes:(row + 1) * row_bytes],
+                      offset + row * self.stride)
+
+    def close(self):
+        os.close(self.fd)
+
+
+# -----------------------------------
+# Player page renderer
+# -----------------------------------
+def _load_font(size):
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+class LitePlayerRenderer:
+    """
+    Draws the player page into an offscreen image and pushes dirty regions.
+
+    The page is split into fixed regions (art, title, artist, progress, like,
+    controls). Each region is redrawn and written out only when the state it
+    shows changes, so a playing track costs one progress-bar strip per frame,
+    plus the title strip while it is scrolling.
+    """
+
+    def __init__(self, framebuffer, cover_cache=None):
+        self.fb = framebuffer
+        self.cover_cache = cover_cache
+        self.image = Image.new("RGB", (framebuffer.width, framebuffer.height), BLACK)
+        self.draw = ImageDraw.Draw(self.image)
+        self.playback = None
+        self.fetched_at = 0
+        self.liked = False
+        self.cover = None  # (url, PIL image) of the current album art
+        self.title_since = 0
+        self._shown = {}  # region name -> state last written to the screen
+        self._layout()
+
+    def _layout(self):
+        w, h = self.fb.width, self.fb.height
+        pad = max(2, h // 40)
+        art = int(min(w * 0.5, h * 0.45))
+        title_h = max(12, h // 13)
+        artist_h = max(10, h // 16)
+        bar_h = max(8, h // 20)
+        button = max(12, min(w // 7, h // 8))
+        y = pad
+        self.regions = {"art": ((w - art) // 2, y, (w + art) // 2, y + art)}
+        y += art + pad
+        self.regions["title"] = (0, y, w, y + title_h)
+        y += title_h
+        self.regions["artist"] = (0, y, w, y + artist_h)
+        y += artist_h + pad
+        self.regions["progress"] = (pad, y, w - pad - bar_h - pad, y + bar_h)
+        self.regions["like"] = (w - pad - bar_h, y, w - pad, y + bar_h)
+        y = max(y + bar_h + pad, h - button - pad)
+        self.regions["controls"] = ((w - 5 * button) // 2, y, (w + 5 * button) // 2, y + button)
+        self.button_size = button
+        self.title_font = _load_font(title_h - 2)
+        self.artist_font = _load_font(artist_h - 2)
+
+    def set_cover(self, cover):
+        """Show newly loaded (url, PIL image) cover art (any thread)."""
+        self.cover = cover
+
+    def set_playback(self, current, liked, cover):
+        """Feed a new snapshot from spotify_controller (any thread)."""
+        old_title = self._title()
+        self.playback = current
+        self.fetched_at = time.monotonic()
+        self.liked = liked
+        self.cover = cover
+        if self._title() != old_title:
+            self.title_since = self.fetched_at
+
+    def render(self):
+        """Redraw whatever changed and write it out. Returns the dirty regions."""
+        now = time.monotonic()
+        dirty = []
+        for name, state in self._states(now).items():
+            if name in self._shown and self._shown[name] == state:
+                continue
+            box = self.regions[name]
+            self.draw.rectangle(box, fill=BLACK)
+            getattr(self, f"_draw_{name}")(box, state)
+            self.fb.write_region(self.image, box)
+            self._shown[name] = state
+            dirty.append(name)
+        return dirty
+
+    def is_animating(self):
+        """True while something (a marquee or a playing track) moves on its own."""
+        return bool(self.playback and self.playback.get("is_playing")) or \
+            self._overflows("title") or self._overflows("artist")
+
+    # Region state: anything that changes how a region looks goes in here.
+    def _states(self, now):
+        current = self.playback or {}
+        item = current.get("item") or {}
+        duration = item.get("duration_ms") or 1
+        progress = current.get("progress_ms") or 0
+        if current.get("is_playing"):
+            progress += (now - self.fetched_at) * 1000
+        box = self.regions["progress"]
+        return {
+            "art": self.cover[0] if self.cover else None,
+            "title": (self._title(), self._marquee_offset("title", now)),
+            "artist": (self._artist(), self._marquee_offset("artist", now)),
+            "progress": int(min(progress / duration, 1) * (box[2] - box[0])) if item else 0,
+            "like": self.liked,
+            "controls": (bool(current.get("is_playing")), bool(current.get("shuffle_state")),
+                         current.get("repeat_state", "off") != "off"),
+        }
+
+    def _title(self):
+        item = (self.playback or {}).get("item")
+        return item.get("name", "Unknown Title") if item else "No song is playing"
+
+    def _artist(self):
+        item = (self.playback or {}).get("item") or {}
+        return ", ".join(a["name"] for a in item.get("artists", []))
+
+    def _text_width(self, name):
+        font = self.title_font if name == "title" else self.artist_font
+        text = self._title() if name == "title" else self._artist()
+        return int(font.getlength(text))
+
+    def _overflows(self, name):
+        box = self.regions[name]
+        return self._text_width(name) > box[2] - box[0]
+
+    def _marquee_offset(self, name, now):
+        if not self._overflows(name):
+            return 0
+        elapsed = now - self.title_since - MARQUEE_DELAY
+        if elapsed <= 0:
+            return 0
+        period = self._text_width(name) + MARQUEE_GAP
+        return int(elapsed * MARQUEE_SPEED) % period
+
+    def _draw_art(self, box, url):
+        left, top, right, bottom = box
+        if self.cover is None:
+            self.draw.rectangle(box, outline=DIM_GREEN)
+            return
+        art = self.cover[1].resize((right - left, bottom - top))
+        self.image.paste(art, (left, top))
+
+    def _draw_text(self, box, text, offset, font, name):
+        left, top, right, bottom = box
+        strip = Image.new("RGB", (right - left, bottom - top), BLACK)
+        draw = ImageDraw.Draw(strip)
+        width = self._text_width(name)
+        if width <= right - left:
+            draw.text(((right - left - width) // 2, 0), text, font=font, fill=GREEN)
+        else:
+            draw.text((-offset, 0), text, font=font, fill=GREEN)
+            draw.text((-offset + width + MARQUEE_GAP, 0), text, font=font, fill=GREEN)
+        self.image.paste(strip, (left, top))
+
+    def _draw_title(self, box, state):
+        self._draw_text(box, state[0], state[1], self.title_font, "title")
+
+    def _draw_artist(self, box, state):
+        self._draw_text(box, state[0], state[1], self.artist_font, "artist")
+
+    def _draw_progress(self, box, filled):
+        left, top, right, bottom = box
+        middle = (top + bottom) // 2
+        self.draw.rectangle((left, middle - 1, right - 1, middle + 1), fill=DIM_GREEN)
+        if filled:
+            self.draw.rectangle((left, middle - 1, left + filled - 1, middle + 1), fill=GREEN)
+
+    def _draw_like(self, box, liked):
+        left, top, right, bottom = box
+        size = right - left
+        r = size // 4
+        fill = GREEN if liked else None
+        self.draw.ellipse((left, top, left + 2 * r, top + 2 * r), fill=fill, outline=GREEN)
+        self.draw.ellipse((right - 2 * r - 1, top, right - 1, top + 2 * r), fill=fill, outline=GREEN)
+        self.draw.polygon([(left, top + r), (right - 1, top + r), (left + size // 2, bottom - 1)],
+                          fill=fill, outline=GREEN)
+
+    def _draw_controls(self, box, state):
+        is_playing, shuffle, repeat = state
+        left, top, _, bottom = box
+        b = self.button_size
+        m = b // 4
+        # Shuffle and repeat are lit when active, like the icon swap in GUI.py.
+        cells = [(left + i * b, top, left + (i + 1) * b - 1, bottom - 1) for i in range(5)]
+        for cell, active in ((cells[0], shuffle), (cells[4], repeat)):
+            self.draw.rounded_rectangle(cell, radius=m, outline=GREEN,
+                                        fill=GREEN if active else None)
+        x0, y0, x1, y1 = cells[0]
+        color = BLACK if shuffle else GREEN
+        self.draw.line((x0 + m, y1 - m, x1 - m, y0 + m), fill=color)
+        self.draw.line((x0 + m, y0 + m, x1 - m, y1 - m), fill=color)
+        x0, y0, x1, y1 = cells[4]
+        color = BLACK if repeat else GREEN
+        self.draw.arc((x0 + m, y0 + m, x1 - m, y1 - m), 30, 330, fill=color)
+        x0, y0, x1, y1 = cells[1]
+        self.draw.polygon([(x1 - m, y0 + m), (x1 - m, y1 - m), (x0 + m + 2, (y0 + y1) // 2)], fill=GREEN)
+        self.draw.rectangle((x0 + m, y0 + m, x0 + m + 1, y1 - m), fill=GREEN)
+        x0, y0, x1, y1 = cells[3]
+        self.draw.polygon([(x0 + m, y0 + m), (x0 + m, y1 - m), (x1 - m - 2, (y0 + y1) // 2)], fill=GREEN)
+        self.draw.rectangle((x1 - m - 1, y0 + m, x1 - m, y1 - m), fill=GREEN)
+        x0, y0, x1, y1 = cells[2]
+        self.draw.ellipse(cells[2], fill=GREEN)
+        if is_playing:
+            self.draw.rectangle((x0 + m + 1, y0 + m, x0 + 2 * m - 1, y1 - m), fill=BLACK)
+            self.draw.rectangle((x1 - 2 * m + 1, y0 + m, x1 - m - 1, y1 - m), fill=BLACK)
+        else:
+            self.draw.polygon([(x0 + m + 1, y0 + m), (x0 + m + 1, y1 - m), (x1 - m, (y0 + y1) // 2)],
+                              fill=BLACK)
+
+
+# -----------------------------------
+# Playback snapshots
+# -----------------------------------
+class PlaybackFeed:
+    """
+    Hands SnapshotPoller snapshots to the renderer, loading the cover art
+    once per track.
+
+    Snapshots arrive on the poller thread, so covers are downloaded by the
+    cover cache's worker and passed to the renderer when they are in; a slow
+    or unreachable image host never holds up playback updates. Failed
+    downloads are retried with a backoff until the track changes.
+    """
+
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self.track_id = None
+        self.cover_url = None  # cover of the current track
+        self.cover = None
+        self._lock = threading.Lock()
+        self._loading = False
+        self._retry_at = 0
+        self._backoff = COVER_RETRY_INITIAL
+
+    def on_snapshot(self, current, liked):
+        item = (current or {}).get("item") or {}
+        track_id = item.get("id")
+        with self._lock:
+            # Cover art only changes with the track.
+            if track_id != self.track_id:
+                self.track_id = track_id
+                self.cover_url = self._cover_url(item)
+                self.cover = None
+                self._loading = False
+                self._retry_at = 0
+                self._backoff = COVER_RETRY_INITIAL
+            if self.cover is None and self.cover_url and not self._loading \
+                    and time.monotonic() >= self._retry_at:
+                self._loading = True
+                self.renderer.cover_cache.request(self.cover_url, self._on_cover_loaded,
+                                                  on_error=self._on_cover_failed)
+            cover = self.cover
+        self.renderer.set_playback(current, bool(liked), cover)
+
+    def _cover_url(self, item):
+        images = item.get("album", {}).get("images", [])
+        if not images or self.renderer.cover_cache is None:
+            return None
+        # The smallest image is plenty for a 1.8" screen.
+        return images[-1]["url"]
+
+    def _on_cover_loaded(self, url, path):
+        try:
+            image = Image.open(path).convert("RGB")
+        except Exception as e:
+            log.error("Error loading cover art: %s", e)
+            self._on_cover_failed(url, e)
+            return
+        with self._lock:
+            if url != self.cover_url:
+                return  # the track changed while this was downloading
+            self.cover = (url, image)
+            self._loading = False
+            self.renderer.set_cover(self.cover)
+
+    def _on_cover_failed(self, url, error):
+        # The cover cache has already logged the error.
+        with self._lock:
+            if url != self.cover_url:
+                return
+            self._loading = False
+            self._retry_at = time.monotonic() + self._backoff
+            self._backoff = min(self._backoff * 2, COVER_RETRY_MAX)
+
+
+def run(renderer, fps=15, idle_fps=2):
+    """Render loop: full frame rate only while something is moving."""
+    while True:
+        started = time.monotonic()
+        renderer.render()
+        rate = fps if renderer.is_animating() else idle_fps
+        time.sleep(max(0, 1 / rate - (time.monotonic() - started)))
+
+
+def _parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Framebuffer Flux player")
+    parser.add_argument("--fb", default=os.getenv("FLUX_FRAMEBUFFER", "/dev/fb1"),
+                        help="framebuffer device, or a regular file to use as a fake one")
+    parser.add_argument("--size", type=_parse_size,
+                        help="WIDTHxHEIGHT, required when --fb is a regular file")
+    parser.add_argument("--bpp", type=int, choices=(16, 32), help="depth of a fake framebuffer")
+    parser.add_argument("--fps", type=float, default=15)
+    args = parser.parse_args()
+
+    setup_logging()
+    framebuffer = Framebuffer(args.fb, args.size, args.bpp)
+    renderer = LitePlayerRenderer(framebuffer, CoverCache(workers=1))
+    SnapshotPoller(PlaybackFeed(renderer).on_snapshot).start()
+    try:
+        run(renderer, args.fps)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        framebuffer.close()
+
+
+if __name__ == "__main__":
+    main()
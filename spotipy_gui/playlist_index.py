@@ -0,0 +1,212 @@
+import json
+import os
+import threading
+
+from ring_log import get_logger
+
+log = get_logger(__name__)
+
+INDEX_PATH = os.getenv("FLUX_PLAYLIST_INDEX",
+                       os.path.join(os.path.expanduser("~"), ".cache", "flux", "playlist_index.json"))
+
+PAGE_SIZE = 100
+TRACK_ID_FIELDS = "items(track(id)),next"
+
+
+class PlaylistMembershipIndex:
+    """
+    Local index from track ID to the editable playlists that contain it.
+
+    Every playlist the user owns or collaborates on is scanned once and then
+    kept by snapshot_id: refresh() only refetches playlists whose snapshot
+    changed since they were indexed, and add()/remove() update the index in
+    place from the snapshot_id the edit returns, so the device's own edits
+    never trigger a rescan. Lookups never touch the network. The index is
+    saved to `path` so a restart only rescans playlists edited elsewhere.
+
+    Args:
+        sp: An authenticated Spotipy client instance.
+        path: JSON file the index is kept in, or "" to keep it in memory only.
+    """
+
+    def __init__(self, sp, path=INDEX_PATH):
+        self.sp = sp
+        self.path = path
+        self.user_id = None
+        self._lock = threading.Lock()
+        # playlist ID -> {"name", "snapshot_id", "tracks": set of track IDs}
+        self._playlists = {}
+        # track ID -> set of playlist IDs
+        self._membership = {}
+        self._load()
+
+    # -----------------------------------
+    # Lookups
+    # -----------------------------------
+    def playlists_for(self, track_id):
+        """IDs of the indexed playlists containing `track_id`."""
+        with self._lock:
+            return set(self._membership.get(track_id, ()))
+
+    def contains(self, playlist_id, track_id):
+        with self._lock:
+            return playlist_id in self._membership.get(track_id, ())
+
+    def name(self, playlist_id):
+        with self._lock:
+            playlist = self._playlists.get(playlist_id)
+            return playlist["name"] if playlist else "playlist"
+
+    def editable_playlists(self):
+        """(playlist ID, name) for every indexed playlist, sorted by name."""
+        with self._lock:
+            playlists = [(pid, p["name"]) for pid, p in self._playlists.items()]
+        return sorted(playlists, key=lambda item: item[1].lower())
+
+    # -----------------------------------
+    # Keeping the index current
+    # -----------------------------------
+    def refresh(self, details):
+        """
+        Bring the index in line with the library, fetching only playlists
+        whose snapshot_id changed. Blocks on the network; call it from a
+        background thread.
+
+        Args:
+            details: The details dict filled in by get_library().
+        """
+        if self.user_id is None:
+            self.user_id = self.sp.current_user()["id"]
+        wanted = {}
+        for entry in details.values():
+            if entry["type"] != "playlist":
+                continue
+            if entry.get("owner") == self.user_id or entry.get("collaborative"):
+                wanted[entry["id"]] = entry
+
+        with self._lock:
+            changed = False
+            for playlist_id in set(self._playlists) - set(wanted):
+                self._drop(playlist_id)
+                changed = True
+            stale = []
+            for playlist_id, entry in wanted.items():
+                playlist = self._playlists.get(playlist_id)
+                if playlist is None:
+                    stale.append((playlist_id, entry, None))
+                else:
+                    playlist["name"] = entry["name"]
+                    if playlist["snapshot_id"] != entry["snapshot_id"]:
+                        stale.append((playlist_id, entry, playlist["snapshot_id"]))
+
+        for playlist_id, entry, indexed_snapshot in stale:
+            try:
+                tracks = self._fetch_track_ids(playlist_id)
+            except Exception as e:
+                log.error("Error indexing playlist %s: %s", entry["name"], e)
+                continue
+            with self._lock:
+                playlist = self._playlists.get(playlist_id)
+                if (playlist["snapshot_id"] if playlist else None) != indexed_snapshot:
+                    # Edited on this device while we were fetching; keep that.
+                    continue
+                self._drop(playlist_id)
+                self._install(playlist_id, entry["name"], entry["snapshot_id"], tracks)
+                changed = True
+        if changed:
+            self._save()
+
+    def add(self, playlist_id, track_id):
+        """Add a track to a playlist and record it in the index; returns the new snapshot_id."""
+        result = self.sp.playlist_add_items(playlist_id, [f"spotify:track:{track_id}"])
+        with self._lock:
+            playlist = self._playlists.get(playlist_id)
+            if playlist is not None:
+                playlist["snapshot_id"] = result["snapshot_id"]
+                playlist["tracks"].add(track_id)
+                self._membership.setdefault(track_id, set()).add(playlist_id)
+        self._save()
+        return result["snapshot_id"]
+
+    def remove(self, playlist_id, track_id):
+        """
+        Remove every occurrence of a track from a playlist and the index;
+        returns the new snapshot_id.
+        """
+        result = self.sp.playlist_remove_all_occurrences_of_items(
+            playlist_id, [f"spotify:track:{track_id}"])
+        with self._lock:
+            playlist = self._playlists.get(playlist_id)
+            if playlist is not None:
+                playlist["snapshot_id"] = result["snapshot_id"]
+                playlist["tracks"].discard(track_id)
+                self._unlink(track_id, playlist_id)
+        self._save()
+        return result["snapshot_id"]
+
+    def _fetch_track_ids(self, playlist_id):
+        tracks = set()
+        results = self.sp.playlist_items(playlist_id, fields=TRACK_ID_FIELDS,
+                                         limit=PAGE_SIZE, additional_types=("track",))
+        while results:
+            for item in results.get("items", []):
+                track = item.get("track") or {}
+                # Local files and unavailable entries have no ID.
+                if track.get("id"):
+                    tracks.add(track["id"])
+            results = self.sp.next(results) if results.get("next") else None
+        return tracks
+
+    # -----------------------------------
+    # Internal bookkeeping (callers hold the lock)
+    # -----------------------------------
+    def _install(self, playlist_id, name, snapshot_id, tracks):
+        self._playlists[playlist_id] = {"name": name, "snapshot_id": snapshot_id,
+                                        "tracks": tracks}
+        for track_id in tracks:
+            self._membership.setdefault(track_id, set()).add(playlist_id)
+
+    def _drop(self, playlist_id):
+        playlist = self._playlists.pop(playlist_id, None)
+        if playlist is not None:
+            for track_id in playlist["tracks"]:
+                self._unlink(track_id, playlist_id)
+
+    def _unlink(self, track_id, playlist_id):
+        playlists = self._membership.get(track_id)
+        if playlists is not None:
+            playlists.discard(playlist_id)
+            if not playlists:
+                del self._membership[track_id]
+
+    # -----------------------------------
+    # Persistence
+    # -----------------------------------
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable playlist index: %s", e)
+            return
+        for playlist_id, playlist in saved.get("playlists", {}).items():
+            self._install(playlist_id, playlist["name"], playlist["snapshot_id"],
+                          set(playlist["tracks"]))
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._lock:
+            saved = {"playlists": {pid: dict(p, tracks=sorted(p["tracks"]))
+                                   for pid, p in self._playlists.items()}}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Write then rename, so a power cut never leaves a truncated index.
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(saved, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.error("Error saving playlist index: %s", e)
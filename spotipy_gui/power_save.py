@@ -0,0 +1,150 @@
+import os
+import time
+
+from ring_log import get_logger
+
+log = get_logger(__name__)
+
+# Seconds without input before the UI idles, regardless of playback.
+IDLE_AFTER = float(os.getenv("FLUX_IDLE_AFTER", "120"))
+# Seconds of paused playback (and no input) before the UI idles.
+IDLE_PAUSED_AFTER = float(os.getenv("FLUX_IDLE_PAUSED_AFTER", "30"))
+# Frame cap and playback polling interval while idle.
+IDLE_FPS = float(os.getenv("FLUX_IDLE_FPS", "5"))
+IDLE_POLL_INTERVAL = float(os.getenv("FLUX_IDLE_POLL_INTERVAL", "5"))
+# Optional sysfs brightness file (e.g. /sys/class/backlight/fb_st7735r/brightness)
+# that is set to 0 while idle. Leave unset to keep the backlight on.
+BACKLIGHT_PATH = os.getenv("FLUX_BACKLIGHT_PATH", "")
+
+
+def _remote_state(current):
+    # What someone on another device would change; a track ending on its own
+    # does not count, so a playing-but-idle UI stays asleep between songs.
+    if not current:
+        return None
+    return (
+        current.get("is_playing"),
+        (current.get("context") or {}).get("uri"),
+        current.get("shuffle_state"),
+        current.get("repeat_state"),
+        (current.get("device") or {}).get("id"),
+    )
+
+
+class Backlight:
+    """Blanks and restores an LCD backlight through its sysfs brightness file."""
+
+    def __init__(self, path=BACKLIGHT_PATH):
+        self.path = path
+        self._saved = None
+
+    @property
+    def blanked(self):
+        return self._saved is not None
+
+    def blank(self):
+        if not self.path or self.blanked:
+            return
+        try:
+            with open(self.path) as f:
+                self._saved = f.read().strip() or "1"
+            with open(self.path, "w") as f:
+                f.write("0")
+        except OSError as e:
+            log.error("Error blanking backlight: %s", e)
+            self._saved = None
+
+    def restore(self):
+        if not self.blanked:
+            return
+        try:
+            with open(self.path, "w") as f:
+                f.write(self._saved)
+        except OSError as e:
+            log.error("Error restoring backlight: %s", e)
+        self._saved = None
+
+
+class IdleManager:
+    """
+    Tracks user input and playback state and decides when the UI should drop
+    into power-save mode.
+
+    The UI idles after `idle_after` seconds without input, or after
+    `paused_after` seconds without input while playback is paused. Any input
+    or remote playback change (play/pause, context, shuffle, repeat, device)
+    wakes it again. on_idle() and on_wake() do the actual throttling.
+
+    CPU time is accounted per mode so the effect can be read off cpu_report().
+    """
+
+    def __init__(self, on_idle, on_wake, idle_after=IDLE_AFTER,
+                 paused_after=IDLE_PAUSED_AFTER):
+        self.on_idle = on_idle
+        self.on_wake = on_wake
+        self.idle_after = idle_after
+        self.paused_after = paused_after
+        self.idle = False
+        self.last_input = time.monotonic()
+        self.paused_since = None
+        self._remote_state = None
+        # mode -> [wall seconds, cpu seconds]
+        self._usage = {"active": [0.0, 0.0], "idle": [0.0, 0.0]}
+        self._mark = (time.monotonic(), time.process_time())
+
+    def input_event(self):
+        """Record user input. Returns True if this woke the UI."""
+        self.last_input = time.monotonic()
+        if self.idle:
+            self._set_idle(False)
+            return True
+        return False
+
+    def observe_playback(self, current):
+        """Record a playback snapshot and idle or wake accordingly."""
+        now = time.monotonic()
+        state = _remote_state(current)
+        changed = self._remote_state is not None and state != self._remote_state
+        self._remote_state = state
+        if current and current.get("is_playing"):
+            self.paused_since = None
+        elif self.paused_since is None:
+            self.paused_since = now
+
+        if changed:
+            # Treat a change made elsewhere like input on the device itself.
+            self.last_input = now
+            if self.idle:
+                self._set_idle(False)
+            return
+
+        quiet_for = now - self.last_input
+        paused_for = now - self.paused_since if self.paused_since is not None else 0
+        if not self.idle and (quiet_for >= self.idle_after or
+                              min(quiet_for, paused_for) >= self.paused_after):
+            self._set_idle(True)
+
+    def cpu_report(self):
+        """Average CPU load of this process in active and idle mode so far."""
+        self._account()
+        parts = []
+        for mode, (wall, cpu) in self._usage.items():
+            if wall > 0:
+                parts.append(f"{mode}: {100 * cpu / wall:.1f}% CPU over {wall:.0f}s")
+        return ", ".join(parts)
+
+    def _set_idle(self, idle):
+        self._account()
+        self.idle = idle
+        if idle:
+            self.on_idle()
+        else:
+            self.on_wake()
+        log.info("Power save %s (%s)", "on" if idle else "off", self.cpu_report())
+
+    def _account(self):
+        wall, cpu = time.monotonic(), time.process_time()
+        usage = self._usage["idle" if self.idle else "active"]
+        usage[0] += wall - self._mark[0]
+        usage[1] += cpu - self._mark[1]
+        self._mark = (wall, cpu)
@@ -0,0 +1,66 @@
+def playback_signature(current):
+    """
+    Return what identifies "where playback is" in a playback snapshot: the
+    current track and context. The queue only changes with one of these, so
+    it is refetched when the signature changes rather than on a timer.
+    """
+    if not current or not current.get("item"):
+        return None
+    context = current.get("context") or {}
+    return current["item"].get("id"), context.get("uri")
+
+
+def queue_rows(queue):
+    """Turn an sp.queue() response into RecycleView data rows."""
+    rows = []
+    for item in (queue or {}).get("queue", []):
+        if not item:
+            continue
+        if item.get("type") == "episode":
+            subtitle = (item.get("show") or {}).get("name", "")
+        else:
+            subtitle = ", ".join(a["name"] for a in item.get("artists", []))
+        rows.append({"text": item.get("name", "Unknown"), "secondary_text": subtitle})
+    return rows
+
+
+def apply_row_diff(data, rows):
+    """
+    Update the RecycleView data list `data` in place to match `rows`,
+    touching only the rows that differ so that only those views redraw.
+
+    Returns the number of rows that were changed, added or removed.
+    """
+    changed = 0
+    common = min(len(data), len(rows))
+    for i in range(common):
+        if data[i] != rows[i]:
+            data[i] = rows[i]
+            changed += 1
+    if len(rows) > common:
+        data.extend(rows[common:])
+        changed += len(rows) - common
+    elif len(data) > common:
+        changed += len(data) - common
+        del data[common:]
+    return changed
+
+
+class QueueTracker:
+    """Decides when the "Up Next" list needs to be refetched."""
+
+    def __init__(self):
+        self.signature = None
+        self.stale = True
+
+    def observe(self, current):
+        """
+        Record a playback snapshot. Returns True if the track or context
+        changed since the last snapshot, which invalidates the queue.
+        """
+        signature = playback_signature(current)
+        if signature != self.signature:
+            self.signature = signature
+            self.stale = True
+            return True
+        return False
@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+# The settings below are read at import, which may come before
+# spotify_controller has loaded .env.
+load_dotenv()
+
+# File the log is flushed to; set it empty to keep the log in memory only.
+LOG_PATH = os.getenv("FLUX_LOG_PATH",
+                     os.path.join(os.path.expanduser("~"), ".cache", "flux", "flux.log"))
+LOG_LEVEL = os.getenv("FLUX_LOG_LEVEL", "INFO").upper()
+# Entries kept in memory for the diagnostics screen.
+BUFFER_SIZE = int(os.getenv("FLUX_LOG_BUFFER", "500"))
+# Seconds between batched writes to LOG_PATH.
+FLUSH_INTERVAL = float(os.getenv("FLUX_LOG_FLUSH_INTERVAL", "60"))
+# Repeats of a warning or error within this many seconds are counted, not
+# recorded.
+REPEAT_WINDOW = float(os.getenv("FLUX_LOG_REPEAT_WINDOW", "60"))
+# Size at which LOG_PATH is rotated to LOG_PATH + ".1".
+MAX_BYTES = int(os.getenv("FLUX_LOG_MAX_BYTES", str(1024 * 1024)))
+# Also echo records to stderr, e.g. when running on a desktop.
+CONSOLE = os.getenv("FLUX_LOG_CONSOLE", "0") == "1"
+
+LOGGER_NAME = "flux"
+
+
+def get_logger(name):
+    """Return the logger for a module, e.g. get_logger(__name__)."""
+    if name == "__main__":
+        name = "main"
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+class LogEntry:
+    """One recorded message, plus how often it repeated since."""
+
+    __slots__ = ("time", "level", "source", "message", "count", "last_time",
+                 "written", "queued")
+
+    def __init__(self, time, level, source, message):
+        self.time = time
+        self.level = level
+        self.source = source
+        self.message = message
+        self.count = 1
+        self.last_time = time
+        self.written = 0  # count as of the last time this entry went to disk
+        self.queued = False
+
+    def to_dict(self):
+        return {
+            "time": self.time,
+            "level": self.level,
+            "source": self.source,
+            "message": self.message,
+            "count": self.count,
+        }
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps recent records in memory and writes them to disk in batches.
+
+    Warnings and errors sharing a logger, level and message template within
+    `repeat_window` seconds are collapsed into one entry whose count goes up,
+    so an error raised on every poll during an outage costs one line per
+    window instead of one write per second. Lower levels are reports (timings,
+    state changes) whose every occurrence matters, so they are never merged. Disk writes happen on a
+    background thread every `flush_interval` seconds, as JSON lines.
+
+    Args:
+        path: File to append to, or "" to keep entries in memory only.
+        capacity: Number of entries kept for entries().
+        flush_interval: Seconds between writes to `path`.
+        repeat_window: Seconds during which repeats are only counted.
+        max_bytes: Size at which `path` is rotated to `path` + ".1".
+    """
+
+    def __init__(self, path=LOG_PATH, capacity=BUFFER_SIZE, flush_interval=FLUSH_INTERVAL,
+                 repeat_window=REPEAT_WINDOW, max_bytes=MAX_BYTES):
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval
+        self.repeat_window = repeat_window
+        self.max_bytes = max_bytes
+        self.version = 0  # bumped on every change, so viewers can skip redraws
+        self._entries = deque(maxlen=capacity)
+        self._recent = {}  # dedupe key -> LogEntry of the current window
+        self._pending = []  # entries waiting to be written
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        if path:
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def emit(self, record):
+        try:
+            message = record.getMessage()
+            if record.exc_info:
+                message += "\n" + self.formatException(record.exc_info)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._buffer_lock:
+            self.version += 1
+            if record.levelno < logging.WARNING:
+                entry = LogEntry(record.created, record.levelname, record.name, message)
+                self._entries.append(entry)
+                self._queue(entry)
+                return
+            # Keyed by template, as exception texts often embed object addresses.
+            key = (record.name, record.levelno, str(record.msg))
+            entry = self._recent.get(key)
+            if entry is not None and record.created - entry.time < self.repeat_window:
+                entry.count += 1
+                entry.last_time = record.created
+                entry.message = message
+                return
+            if entry is not None:
+                # Write the final count of the window that just closed.
+                self._queue(entry)
+            entry = LogEntry(record.created, record.levelname, record.name, message)
+            self._recent[key] = entry
+            self._entries.append(entry)
+            self._queue(entry)
+            if not self.path and len(self._recent) > self._entries.maxlen:
+                # Nothing flushes, so expire finished windows here instead.
+                self._recent = {k: e for k, e in self._recent.items()
+                                if record.created - e.time < self.repeat_window}
+
+    def _queue(self, entry):
+        if self.path and entry.count > entry.written and not entry.queued:
+            entry.queued = True
+            self._pending.append(entry)
+
+    def entries(self):
+        """Buffered entries, oldest first."""
+        with self._buffer_lock:
+            return list(self._entries)
+
+    def flush(self):
+        if not self.path:
+            return
+        now = time.time()
+        with self._buffer_lock:
+            # Closed windows whose message never came back still owe their count.
+            for key, entry in list(self._recent.items()):
+                if now - entry.time >= self.repeat_window:
+                    self._queue(entry)
+                    del self._recent[key]
+            pending, self._pending = self._pending, []
+            lines = []
+            for entry in pending:
+                lines.append(json.dumps(entry.to_dict()) + "\n")
+                entry.written = entry.count
+                entry.queued = False
+        if not lines:
+            return
+        with self._flush_lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a") as f:
+                    f.writelines(lines)
+            except OSError:
+                # Nowhere to report this; the entries stay visible in memory.
+                pass
+
+    def close(self):
+        # Called by logging.shutdown(); write counts of still-open windows too.
+        with self._buffer_lock:
+            for entry in self._recent.values():
+                self._queue(entry)
+        self.flush()
+        super().close()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+_handler = None
+
+
+def setup_logging():
+    """
+    Route the "flux" loggers into a RingBufferHandler and return it.
+
+    Safe to call more than once; later calls return the same handler.
+    """
+    global _handler
+    if _handler is None:
+        _handler = RingBufferHandler()
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.setLevel(LOG_LEVEL)
+        logger.addHandler(_handler)
+        # Kivy attaches its own (synchronous) file handler to the root logger.
+        logger.propagate = False
+        if CONSOLE:
+            console = logging.StreamHandler()
+            console.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+            logger.addHandler(console)
+    return _handler
@@ -0,0 +1,79 @@
+import threading
+
+from spotify_controller import get_current_playback, is_track_liked
+from ring_log import get_logger
+
+log = get_logger(__name__)
+
+# Seconds between playback polls while the screen is in use
+POLL_INTERVAL = 1
+
+
+def call_now(callback):
+    callback()
+
+
+class SnapshotPoller:
+    """
+    Polls playback on one background thread so no front-end waits on the
+    Web API, and hands every snapshot to on_snapshot(current, liked).
+
+    This is the one playback update path of every front-end: the Kivy apps
+    dispatch snapshots to their main thread, lite_player takes them on the
+    poller thread itself.
+
+    Args:
+        on_snapshot: Called with the get_current_playback() result and the
+            current track's liked state (None if unknown).
+        on_error: Optional callable run with the exception when a poll fails.
+        interval: Seconds between polls.
+        dispatch: Called with a no-argument callable to run the callbacks on
+            the right thread; by default they run on the poller thread.
+    """
+
+    def __init__(self, on_snapshot, on_error=None, interval=POLL_INTERVAL, dispatch=call_now):
+        self.on_snapshot = on_snapshot
+        self.on_error = on_error
+        self.interval = interval
+        self.dispatch = dispatch
+        self._wake = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def set_interval(self, interval):
+        self.interval = interval
+
+    def poll_now(self):
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                current = get_current_playback()
+            except Exception as e:
+                log.error("Error fetching playback: %s", e)
+                if self.on_error is not None:
+                    self._dispatch(lambda e=e: self.on_error(e))
+            else:
+                liked = self._liked(current)
+                self._dispatch(lambda current=current, liked=liked: self.on_snapshot(current, liked))
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _dispatch(self, callback):
+        try:
+            self.dispatch(callback)
+        except Exception as e:
+            # Keep polling; a front-end bug must not stop playback updates.
+            log.exception("Error handling playback snapshot: %s", e)
+
+    def _liked(self, current):
+        track_id = ((current or {}).get("item") or {}).get("id")
+        if not track_id:
+            return None
+        try:
+            return is_track_liked(track_id)
+        except Exception as e:
+            log.error("Error checking liked status: %s", e)
+            return None
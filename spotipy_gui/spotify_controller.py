@@ -1,38 +1,68 @@
 import os
 from dotenv import load_dotenv
 import spotipy
+from spotipy.exceptions import SpotifyException
 from spotipy.oauth2 import SpotifyOAuth
+from ring_log import get_logger
 
 # Load environment variables
 load_dotenv()
 
+log = get_logger(__name__)
+
 # Spotify API credentials
 SPOTIPY_CLIENT_ID = os.getenv("SPOTIPY_CLIENT_ID")
 SPOTIPY_CLIENT_SECRET = os.getenv("SPOTIPY_CLIENT_SECRET")
 SPOTIPY_REDIRECT_URI = os.getenv("SPOTIPY_REDIRECT_URI")
 
+# Connect device name of the local spotifyd
+DEVICE_NAME = os.getenv("FLUX_SPOTIFYD_DEVICE_NAME", "PiPiece")
+
+# playlist-read-collaborative lets current_user_playlists() return the
+# collaborative playlists the playlist index offers for editing.
 scope = ("user-library-modify user-library-read playlist-read-private "
-         "playlist-modify-public playlist-modify-private user-modify-playback-state "
-         "user-read-playback-state user-read-currently-playing")
+         "playlist-read-collaborative playlist-modify-public playlist-modify-private "
+         "user-modify-playback-state user-read-playback-state user-read-currently-playing")
 
 sp = spotipy.Spotify(auth_manager=SpotifyOAuth(client_id=SPOTIPY_CLIENT_ID,
                                               client_secret=SPOTIPY_CLIENT_SECRET,
                                               redirect_uri=SPOTIPY_REDIRECT_URI,
                                               scope=scope))
 
-# Decorator to ensure spotifyd (PiPiece) is active
+# Decorator to ensure spotifyd (DEVICE_NAME) is active
 def ensure_spotifyd_active(func):
     def wrapper(*args, **kwargs):
-        activate_spotifyd_device("PiPiece")
+        activate_spotifyd_device(DEVICE_NAME)
         return func(*args, **kwargs)
     return wrapper
 
+# Device name -> Connect device ID, filled by every device lookup. IDs stay
+# valid until spotifyd re-registers, which play_context_by_url() detects.
+_device_ids = {}
+
+def find_device(device_name):
+    """Return the Connect device with the given name, or None if it is not registered."""
+    devices = sp.devices().get("devices", [])
+    device = next((d for d in devices if d["name"] == device_name), None)
+    if device is not None:
+        _device_ids[device_name] = device["id"]
+    else:
+        _device_ids.pop(device_name, None)
+    return device
+
+def get_device_id(device_name):
+    """Return the cached ID of the named device, looking it up only on a miss."""
+    device_id = _device_ids.get(device_name)
+    if device_id is None:
+        device = find_device(device_name)
+        device_id = device["id"] if device else None
+    return device_id
+
 def activate_spotifyd_device(device_name):
     """
     Transfer playback to the device (running spotifyd) with the given name.
     """
-    devices = sp.devices().get("devices", [])
-    target_device = next((d for d in devices if d["name"] == device_name), None)
+    target_device = find_device(device_name)
     if target_device is None:
         return f"Device '{device_name}' not found."
     device_id = target_device["id"]
@@ -63,6 +93,31 @@ def toggle_like_current_song():
             return "Song liked!"
     return "No song is currently playing."
 
+def toggle_track_in_playlist(index, playlist_id, track_id):
+    """
+    Add a track to a playlist, or remove it if the playlist already has it.
+
+    Membership is read from a PlaylistMembershipIndex, so only the edit
+    itself goes over the network.
+
+    Args:
+        index: The PlaylistMembershipIndex to check and update.
+        playlist_id: The playlist to edit.
+        track_id: The track to add or remove, usually the current song.
+
+    Returns:
+        A (message, snapshot_id) tuple: a message describing the change and
+        the playlist's new snapshot_id, or None if nothing was changed.
+    """
+    if not track_id:
+        return "No song is currently playing.", None
+    name = index.name(playlist_id)
+    if index.contains(playlist_id, track_id):
+        snapshot_id = index.remove(playlist_id, track_id)
+        return f"Song removed from {name}.", snapshot_id
+    snapshot_id = index.add(playlist_id, track_id)
+    return f"Song added to {name}.", snapshot_id
+
 @ensure_spotifyd_active
 def next_song():
     sp.next_track()
@@ -93,20 +148,64 @@ def toggle_loop():
         return f"Loop is now set to {new_repeat}."
     return "No song is playing."
 
+# Volume of the active device as of the last playback poll
+_last_volume = None
+
 def get_current_playback():
     """Helper function to get current playback state"""
-    return sp.current_playback()
+    global _last_volume
+    current = sp.current_playback()
+    if current and current.get("device"):
+        _last_volume = current["device"].get("volume_percent", _last_volume)
+    return current
+
+def change_volume(delta):
+    """
+    Change the volume by `delta` percentage points in a single request, using
+    the volume seen by the last playback poll as the starting point.
+    """
+    if _last_volume is None:
+        get_current_playback()
+    return set_volume((_last_volume or 0) + delta)
+
+def set_volume(volume):
+    """Set the volume of the active device to `volume` percent."""
+    global _last_volume
+    volume = max(0, min(100, int(volume)))
+    sp.volume(volume)
+    _last_volume = volume
+    return f"Volume set to {volume}%."
+
+def get_queue():
+    """Helper function to get the user's playback queue"""
+    return sp.queue()
 
 def is_track_liked(track_id):
     """Check if a track is saved in the user's library"""
     return sp.current_user_saved_tracks_contains([track_id])[0] 
      
-def get_library(sp):
+def _thumbnail_url(images, min_width=64):
+    """Pick the smallest image that is still at least `min_width` pixels wide."""
+    images = [img for img in (images or []) if img.get('url')]
+    if not images:
+        return None
+    wide_enough = [img for img in images if (img.get('width') or 0) >= min_width]
+    if wide_enough:
+        return min(wide_enough, key=lambda img: img.get('width') or 0)['url']
+    # Spotify lists images largest first; unsized images (e.g. playlist mosaics)
+    # have no width, so fall back to the last one.
+    return images[-1]['url']
+
+def get_library(sp, details=None):
     """
     Retrieve the current user's playlists and saved albums from Spotify.
 
     Args:
         sp: An authenticated Spotipy client instance.
+        details: Optional dict that is filled with extra metadata per URL
+            ({"type", "id", "name", "uri", "snapshot_id", "image"}) for every
+            playlist and album. Playlists also get "owner" (the owner's user ID) and
+            "collaborative".
 
     Returns:
         A tuple (playlist_links, album_links) where:
@@ -122,6 +221,17 @@ def get_library(sp):
             url = playlist.get('external_urls', {}).get('spotify')
             if url:
                 playlist_links[url] = playlist.get('name', 'Unknown')
+                if details is not None:
+                    details[url] = {
+                        "type": "playlist",
+                        "id": playlist.get('id'),
+                        "name": playlist_links[url],
+                        "uri": playlist.get('uri') or context_uri(url),
+                        "snapshot_id": playlist.get('snapshot_id'),
+                        "image": _thumbnail_url(playlist.get('images')),
+                        "owner": (playlist.get('owner') or {}).get('id'),
+                        "collaborative": playlist.get('collaborative', False),
+                    }
         # Get the next page of results if available
         results = sp.next(results) if results.get('next') else None
 
@@ -134,38 +244,74 @@ def get_library(sp):
             url = album.get('external_urls', {}).get('spotify')
             if url:
                 album_links[url] = album.get('name', 'Unknown')
+                if details is not None:
+                    details[url] = {
+                        "type": "album",
+                        "id": album.get('id'),
+                        "name": album_links[url],
+                        "uri": album.get('uri') or context_uri(url),
+                        "snapshot_id": None,
+                        "image": _thumbnail_url(album.get('images')),
+                    }
         # Get the next page of results if available
         results = sp.next(results) if results.get('next') else None
 
     return playlist_links, album_links
 
 
-def play_context_by_url(sp, url, device_name="PiPiece"):
+def context_uri(url):
+    """
+    Convert a Spotify URL to its URI, e.g. "https://open.spotify.com/playlist/abc123"
+    to "spotify:playlist:abc123". URIs are returned unchanged.
+    """
+    if url.startswith("spotify:"):
+        return url
+    # Remove any query parameters (e.g., '?si=...') from the URL.
+    base_url = url.split('?')[0]
+    return base_url.replace("https://open.spotify.com/", "spotify:").replace("/", ":")
+
+
+def play_context_by_url(sp, url, device_name=DEVICE_NAME, offset=None, position_ms=None):
     """
-    Given a Spotify URL for a playlist or album, convert it to the corresponding Spotify
-    context URI and start playback for that context.
+    Start playback of a playlist or album on the named device.
+
+    Playback is started with a single request aimed at the cached device ID,
+    which also moves playback to that device, so the previous context is never
+    resumed there first. Only if the cached ID has gone stale is the device
+    looked up again and the request retried once.
 
     Args:
         sp: An authenticated Spotipy client instance.
-        url: A Spotify URL (e.g., 'https://open.spotify.com/playlist/xxx' or 'https://open.spotify.com/album/xxx').
-        device_name: The device to transfer playback to (default is "PiPiece").
+        url: A Spotify URL (e.g., 'https://open.spotify.com/playlist/xxx') or a
+            context URI (e.g., 'spotify:album:xxx'), such as the "uri" in
+            get_library() details.
+        device_name: The device to play on (default is DEVICE_NAME).
+        offset: Optional start offset within the context, e.g. {"position": 3}
+            or {"uri": "spotify:track:xxx"}.
+        position_ms: Optional position to start the first track at.
 
     Returns:
         A message indicating whether playback was successfully started or if an error occurred.
     """
-    # Transfer playback to the desired device (assumes activate_spotifyd_device is defined)
-    transfer_message = activate_spotifyd_device(device_name)
-    print(transfer_message)
-
-    # Remove any query parameters (e.g., '?si=...') from the URL.
-    base_url = url.split('?')[0]
-
-    # Convert the URL to a Spotify URI.
-    # Example: "https://open.spotify.com/playlist/abc123" becomes "spotify:playlist:abc123"
-    context_uri = base_url.replace("https://open.spotify.com/", "spotify:").replace("/", ":")
-
+    uri = context_uri(url)
     try:
-        sp.start_playback(context_uri=context_uri)
-        return f"Playback started for context: {context_uri}"
+        device_id = get_device_id(device_name)
+        if device_id is None:
+            return f"Device '{device_name}' not found."
+        try:
+            sp.start_playback(device_id=device_id, context_uri=uri,
+                              offset=offset, position_ms=position_ms)
+        except SpotifyException as e:
+            if e.http_status != 404:
+                raise
+            # spotifyd re-registered under a new ID since it was cached.
+            log.info("Device ID for '%s' went stale; looking it up again", device_name)
+            device = find_device(device_name)
+            if device is None:
+                return f"Device '{device_name}' not found."
+            sp.start_playback(device_id=device["id"], context_uri=uri,
+                              offset=offset, position_ms=position_ms)
+        return f"Playback started for context: {uri}"
     except Exception as e:
-        return f"Failed to start playback: {e}"
\ No newline at end of file
+        log.error("Failed to start playback of %s: %s", uri, e)
+        return f"Failed to start playback: {e}"
@@ -0,0 +1,226 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+from spotify_controller import find_device, DEVICE_NAME
+from alsa_volume import ALSA_DEVICE, ALSA_CONTROL
+from ring_log import get_logger
+
+log = get_logger(__name__)
+
+SUPERVISE = os.getenv("FLUX_SPOTIFYD_SUPERVISE", "0") == "1"
+# Binary built from the spotifyd submodule, falling back to one on $PATH.
+_SUBMODULE_BIN = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "..", "spotifyd", "target", "release", "spotifyd")
+SPOTIFYD_BIN = os.getenv("FLUX_SPOTIFYD_BIN") or (
+    _SUBMODULE_BIN if os.path.exists(_SUBMODULE_BIN) else shutil.which("spotifyd") or "spotifyd")
+CONFIG_PATH = os.getenv("FLUX_SPOTIFYD_CONFIG",
+                        os.path.join(os.path.expanduser("~"), ".config", "flux", "spotifyd.conf"))
+LOG_PATH = os.getenv("FLUX_SPOTIFYD_LOG", "")
+
+# Generated spotifyd settings
+BACKEND = os.getenv("FLUX_SPOTIFYD_BACKEND", "alsa")
+BITRATE = os.getenv("FLUX_SPOTIFYD_BITRATE", "160")
+BITRATES = ("96", "160", "320")
+AUDIO_DEVICE = os.getenv("FLUX_SPOTIFYD_AUDIO_DEVICE", "default")
+# spotifyd logs in with the credentials cached here. Log in once with
+# `spotifyd authenticate --cache-path <this path>`, or point it at the cache
+# of an existing spotifyd setup, or give credentials below.
+CACHE_PATH = os.getenv("FLUX_SPOTIFYD_CACHE_PATH",
+                       os.path.join(os.path.expanduser("~"), ".cache", "flux", "spotifyd"))
+CACHE_SIZE_MB = int(os.getenv("FLUX_SPOTIFYD_CACHE_SIZE_MB", "512"))
+# Optional credentials, passed through to spotifyd as-is
+USERNAME = os.getenv("FLUX_SPOTIFYD_USERNAME", "")
+PASSWORD_CMD = os.getenv("FLUX_SPOTIFYD_PASSWORD_CMD", "")
+USE_KEYRING = os.getenv("FLUX_SPOTIFYD_USE_KEYRING", "0") == "1"
+
+# Seconds between health checks while waiting for the device and once it is up
+STARTUP_CHECK_INTERVAL = 1
+HEALTH_CHECK_INTERVAL = 15
+# Seconds a fresh process gets to show up as a Connect device, once spotifyd
+# has registered at least once (before that, it may simply not be logged in)
+REGISTER_TIMEOUT = 45
+# Consecutive failed device lookups before a running process is restarted
+MAX_MISSED_CHECKS = 3
+# Restart backoff: doubles per failure up to the maximum, and resets once
+# the daemon has stayed healthy for BACKOFF_RESET seconds
+BACKOFF_INITIAL = 1
+BACKOFF_MAX = 60
+BACKOFF_RESET = 120
+
+
+def build_config():
+    """Return the spotifyd.conf contents for the current settings."""
+    # Checked here rather than at import, so a bad value only stops the
+    # supervisor and not the app.
+    if BITRATE.strip() not in BITRATES:
+        raise ValueError(f"FLUX_SPOTIFYD_BITRATE must be 96, 160 or 320, not {BITRATE!r}")
+    settings = {
+        "device_name": DEVICE_NAME,
+        "device_type": "speaker",
+        "backend": BACKEND,
+        "bitrate": int(BITRATE),
+        "cache_path": CACHE_PATH,
+        "max_cache_size": CACHE_SIZE_MB * 1024 * 1024,
+        "no_audio_cache": CACHE_SIZE_MB == 0,
+    }
+    if USERNAME:
+        settings["username"] = USERNAME
+    if PASSWORD_CMD:
+        settings["password_cmd"] = PASSWORD_CMD
+    if USE_KEYRING:
+        settings["use_keyring"] = True
+    if BACKEND == "alsa":
+        # Share the mixer with AlsaVolume, with the same linear mapping.
+        settings.update({
+            "device": AUDIO_DEVICE,
+            "control": ALSA_DEVICE,
+            "mixer": ALSA_CONTROL,
+            "volume_controller": "alsa_linear",
+        })
+    lines = ["[global]"]
+    for key, value in settings.items():
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif isinstance(value, str):
+            value = '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        lines.append(f"{key} = {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_config(path=CONFIG_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.makedirs(CACHE_PATH, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(build_config())
+    return path
+
+
+class SpotifydSupervisor:
+    """
+    Runs spotifyd as a child process and keeps it registered with Spotify.
+
+    The daemon is started with a generated config, then checked both as a
+    process and as a Connect device. If it exits, drops off the device
+    list, or stops registering after having done so before, it is restarted
+    with exponential backoff. A daemon that has never registered is most
+    likely not logged in, which a restart does not fix, so it is left
+    running and a warning is logged instead.
+
+    Args:
+        on_ready: Called with the Connect device ID whenever the device
+            (re)appears. Runs on the supervisor thread.
+        on_down: Called with a reason string when the device is lost.
+    """
+
+    def __init__(self, on_ready=None, on_down=None):
+        self.on_ready = on_ready
+        self.on_down = on_down
+        self.process = None
+        self.device_id = None
+        self.registered = False  # has spotifyd ever shown up as a device
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._terminate()
+
+    def _run(self):
+        try:
+            config_path = write_config()
+        except (OSError, ValueError) as e:
+            log.error("Not starting spotifyd: %s", e)
+            return
+        backoff = BACKOFF_INITIAL
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self._launch(config_path)
+                reason = self._watch(started)
+            except OSError as e:
+                reason = f"could not start spotifyd: {e}"
+            self._terminate()
+            if self._stop.is_set():
+                break
+            self._set_down(reason)
+            if time.monotonic() - started > BACKOFF_RESET:
+                backoff = BACKOFF_INITIAL
+            log.warning("spotifyd %s; restarting in %ss", reason, backoff)
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, BACKOFF_MAX)
+
+    def _launch(self, config_path):
+        log_file = open(LOG_PATH, "ab") if LOG_PATH else subprocess.DEVNULL
+        try:
+            self.process = subprocess.Popen(
+                [SPOTIFYD_BIN, "--no-daemon", "--config-path", config_path],
+                stdin=subprocess.DEVNULL, stdout=log_file, stderr=log_file)
+        finally:
+            if LOG_PATH:
+                log_file.close()
+
+    def _watch(self, started):
+        """Block while spotifyd is healthy; return why it stopped being so."""
+        missed = 0
+        warned = False
+        while not self._stop.is_set():
+            if self.process.poll() is not None:
+                return f"exited with code {self.process.returncode}"
+            try:
+                device = find_device(DEVICE_NAME)
+            except Exception as e:
+                # The Web API being unreachable says nothing about spotifyd.
+                log.error("Error checking spotifyd device: %s", e)
+                device = {"id": self.device_id} if self.device_id else None
+            if device is not None:
+                missed = 0
+                self.registered = True
+                if device["id"] != self.device_id:
+                    self.device_id = device["id"]
+                    if self.on_ready:
+                        self.on_ready(self.device_id)
+            elif self.device_id is not None:
+                missed += 1
+                if missed >= MAX_MISSED_CHECKS:
+                    return "dropped off the device list"
+            elif time.monotonic() - started > REGISTER_TIMEOUT:
+                if self.registered:
+                    return f"did not register within {REGISTER_TIMEOUT}s"
+                if not warned:
+                    warned = True
+                    log.warning("spotifyd has not registered after %ss; is it logged in? "
+                                "Run: spotifyd authenticate --cache-path %s",
+                                REGISTER_TIMEOUT, CACHE_PATH)
+            # Check quickly until the device is up, and again once it goes missing.
+            interval = HEALTH_CHECK_INTERVAL if self.device_id and not missed \
+                else STARTUP_CHECK_INTERVAL
+            try:
+                # Returns as soon as the process exits, so crashes are seen at once.
+                self.process.wait(timeout=interval)
+            except subprocess.TimeoutExpired:
+                pass
+        return "stopped"
+
+    def _set_down(self, reason):
+        if self.device_id is not None:
+            self.device_id = None
+            if self.on_down:
+                self.on_down(reason)
+
+    def _terminate(self):
+        process = self.process
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
@@ -0,0 +1,103 @@
+"""
+HardwareInput against real kernel input devices.
+
+Events are injected through a uinput virtual device, so this needs
+python-evdev and write access to /dev/uinput (e.g. run with sudo, or add the
+user to the "input" group); otherwise the tests are skipped:
+
+    python -m pytest test_hardware_input.py
+"""
+import os
+import time
+
+import pytest
+
+evdev = pytest.importorskip("evdev")
+from evdev import ecodes
+
+import hardware_input
+
+pytestmark = pytest.mark.skipif(not os.access("/dev/uinput", os.W_OK),
+                                reason="needs write access to /dev/uinput")
+
+VOLUME_INTERVAL = 0.3
+
+
+@pytest.fixture
+def virtual_device():
+    capabilities = {
+        ecodes.EV_KEY: [ecodes.KEY_PLAYPAUSE, ecodes.KEY_NEXTSONG],
+        ecodes.EV_REL: [ecodes.REL_X],
+    }
+    ui = evdev.UInput(capabilities, name="flux-test rotary")
+    # Give udev a moment to create the device node.
+    time.sleep(0.2)
+    device = evdev.InputDevice(ui.device.path)
+    yield ui, device
+    device.close()
+    ui.close()
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, *args):
+        self.calls.append(args)
+
+    def wait_for(self, count, timeout=2):
+        deadline = time.monotonic() + timeout
+        while len(self.calls) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return len(self.calls) >= count
+
+
+def press(ui, code):
+    ui.write(ecodes.EV_KEY, code, 1)
+    ui.write(ecodes.EV_KEY, code, 0)
+    ui.syn()
+
+
+def test_encoder_detents_are_coalesced(virtual_device):
+    ui, device = virtual_device
+    volume = Recorder()
+    handler = hardware_input.HardwareInput({}, volume, devices=[device],
+                                           volume_interval=VOLUME_INTERVAL)
+    handler.start()
+
+    for _ in range(10):
+        ui.write(ecodes.EV_REL, ecodes.REL_X, 1)
+        ui.syn()
+        time.sleep(0.01)
+    time.sleep(VOLUME_INTERVAL * 3)
+
+    deltas = [delta for (delta,) in volume.calls]
+    # The first detent goes out at once, the rest of the spin as one request.
+    assert sum(deltas) == 10 * hardware_input.VOLUME_STEP
+    assert 1 <= len(deltas) <= 2
+
+
+def test_first_press_only_wakes(virtual_device):
+    ui, device = virtual_device
+    play_pause = Recorder()
+    asleep = [True]
+
+    def on_input():
+        if asleep[0]:
+            asleep[0] = False
+            return True
+        return False
+
+    handler = hardware_input.HardwareInput({"play_pause": play_pause}, lambda delta: None,
+                                           devices=[device], on_input=on_input)
+    handler.start()
+
+    press(ui, ecodes.KEY_PLAYPAUSE)
+    time.sleep(0.2)
+    assert not asleep[0]
+    assert play_pause.calls == []
+
+    time.sleep(hardware_input.DEBOUNCE)
+    press(ui, ecodes.KEY_PLAYPAUSE)
+    assert play_pause.wait_for(1)
+    assert len(play_pause.calls) == 1
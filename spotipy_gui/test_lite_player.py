@@ -0,0 +1,68 @@
+"""
+lite_player against a file-backed fake framebuffer.
+
+    python -m pytest test_lite_player.py
+"""
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+
+# spotify_controller builds its client at import; no request is ever made here.
+for key in ("SPOTIPY_CLIENT_ID", "SPOTIPY_CLIENT_SECRET"):
+    os.environ.setdefault(key, "test")
+os.environ.setdefault("SPOTIPY_REDIRECT_URI", "http://localhost:8888/callback")
+
+import lite_player
+
+SIZE = (160, 128)  # the 1.8" panel lite_player targets
+
+
+@pytest.fixture
+def framebuffer(tmp_path):
+    fb = lite_player.Framebuffer(str(tmp_path / "fb"), SIZE)
+    yield fb
+    fb.close()
+
+
+def read_fb(fb):
+    with open(fb.path, "rb") as f:
+        return f.read()
+
+
+def changed_pixels(fb, before, after):
+    """(x, y) of every pixel whose bytes differ between two framebuffer dumps."""
+    bytes_per_pixel = fb.bpp // 8
+    return {((i % fb.stride) // bytes_per_pixel, i // fb.stride)
+            for i in range(len(after)) if before[i] != after[i]}
+
+
+def test_to_rgb565_packs_known_pixels():
+    image = Image.new("RGB", (3, 1))
+    image.putdata([(255, 0, 0), (0, 255, 0), (0, 0, 255)])
+    # Little-endian RRRRRGGG GGGBBBBB
+    assert lite_player.to_rgb565(image) == b"\x00\xf8\xe0\x07\x1f\x00"
+
+
+def test_render_writes_only_changed_regions(framebuffer):
+    renderer = lite_player.LitePlayerRenderer(framebuffer)
+    assert set(renderer.render()) == set(renderer.regions)
+    assert renderer.render() == []
+
+    before = read_fb(framebuffer)
+    renderer.set_playback(None, True, None)
+    assert renderer.render() == ["like"]
+    after = read_fb(framebuffer)
+
+    left, top, right, bottom = renderer.regions["like"]
+    changed = changed_pixels(framebuffer, before, after)
+    assert changed
+    assert all(left <= x < right and top <= y < bottom for x, y in changed)
+
+    # What reached the file is the RGB565 form of the offscreen image.
+    x, y = next(iter(changed))
+    offset = y * framebuffer.stride + x * 2
+    pixel = Image.new("RGB", (1, 1), renderer.image.getpixel((x, y)))
+    assert after[offset:offset + 2] == lite_player.to_rgb565(pixel)
@@ -0,0 +1,50 @@
+import os
+
+from ring_log import get_logger
+
+log = get_logger(__name__)
+
+# "material" keeps the KivyMD floating action buttons; "flat" draws every
+# control from a pre-rendered icon atlas with no shadows or ripples.
+THEME = os.getenv("FLUX_THEME", "material")
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+ICON_ATLAS = os.path.join(ASSETS_DIR, "icons")
+
+# Every icon the player page can show; build_icon_atlas.py renders these.
+CONTROL_ICONS = (
+    "shuffle", "shuffle-variant", "skip-previous", "play", "pause",
+    "skip-next", "repeat", "repeat-variant", "heart", "heart-outline",
+)
+
+MATERIAL_KV = '''
+<ControlButton@MDFloatingActionButton>:
+    md_bg_color: 0, 1, 0, 1
+'''
+
+# Icon changes just point the Image at another region of the same texture,
+# so nothing is re-rasterized or re-uploaded.
+FLAT_KV = '''
+#:import ICON_ATLAS theme.ICON_ATLAS
+
+<ControlButton@ButtonBehavior+Image>:
+    icon: ""
+    source: "atlas://" + ICON_ATLAS + "/" + self.icon if self.icon else ""
+    allow_stretch: True
+    keep_ratio: True
+    mipmap: False
+'''
+
+
+def use_flat_theme():
+    """True if the flat theme was requested and its atlas has been built."""
+    if THEME != "flat":
+        return False
+    if not os.path.exists(ICON_ATLAS + ".atlas"):
+        log.warning("Icon atlas not built; run build_icon_atlas.py. Using the material theme.")
+        return False
+    return True
+
+
+def control_button_kv(flat):
+    return FLAT_KV if flat else MATERIAL_KV
@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+
+PAGE_SIZE = 50
+
+PLAYLIST_FIELDS = ("total,items(track(id,name,uri,external_urls,"
+                   "artists(name,external_urls)))")
+
+
+class TrackPageCache:
+    """
+    Page-by-page cache of playlist and album tracks.
+
+    Pages are cached per context version: playlists are keyed by their
+    snapshot_id, so an edited playlist is refetched while an unchanged one
+    never is; albums are immutable and keyed by ID alone. Only the
+    `max_contexts` most recently opened contexts are kept.
+
+    Args:
+        sp: An authenticated Spotipy client instance.
+        page_size: Tracks per page (the Web API allows up to 50 for playlists).
+        max_contexts: Number of playlists/albums to keep pages for.
+    """
+
+    def __init__(self, sp, page_size=PAGE_SIZE, max_contexts=32):
+        self.sp = sp
+        self.page_size = page_size
+        self.max_contexts = max_contexts
+        self._lock = threading.Lock()
+        # (type, id, snapshot_id) -> {"total": int or None, "pages": {index: [tracks]}}
+        self._contexts = OrderedDict()
+
+    def get_page(self, kind, context_id, page, snapshot_id=None):
+        """
+        Return (tracks, total) for one page of a playlist or album, fetching
+        it from the API only if it is not cached yet. Unavailable playlist
+        entries are returned as None so positions stay aligned with Spotify's
+        offsets.
+
+        Args:
+            kind: "playlist" or "album".
+            context_id: The Spotify ID of the playlist or album.
+            page: Zero-based page index.
+            snapshot_id: The playlist's current snapshot_id, if known.
+        """
+        key = (kind, context_id, snapshot_id)
+        with self._lock:
+            entry = self._contexts.get(key)
+            if entry is not None:
+                self._contexts.move_to_end(key)
+                tracks = entry["pages"].get(page)
+                if tracks is not None:
+                    return tracks, entry["total"]
+
+        tracks, total = self._fetch_page(kind, context_id, page)
+
+        with self._lock:
+            entry = self._contexts.get(key)
+            if entry is None:
+                # A new snapshot replaces whatever was cached for older ones.
+                for stale in [k for k in self._contexts if k[:2] == key[:2]]:
+                    del self._contexts[stale]
+                entry = self._contexts[key] = {"total": total, "pages": {}}
+            entry["total"] = total
+            entry["pages"][page] = tracks
+            self._contexts.move_to_end(key)
+            while len(self._contexts) > self.max_contexts:
+                self._contexts.popitem(last=False)
+        return tracks, total
+
+    def page_count(self, total):
+        return (total + self.page_size - 1) // self.page_size
+
+    def invalidate(self, kind, context_id):
+        """Drop every cached page of a playlist or album."""
+        with self._lock:
+            for stale in [k for k in self._contexts if k[:2] == (kind, context_id)]:
+                del self._contexts[stale]
+
+    def _fetch_page(self, kind, context_id, page):
+        offset = page * self.page_size
+        if kind == "playlist":
+            results = self.sp.playlist_items(context_id, fields=PLAYLIST_FIELDS,
+                                             limit=self.page_size, offset=offset,
+                                             additional_types=("track",))
+            tracks = [item.get("track") if item else None
+                      for item in results.get("items", [])]
+        else:
+            results = self.sp.album_tracks(context_id, limit=self.page_size, offset=offset)
+            tracks = results.get("items", [])
+        return tracks, results.get("total", len(tracks))
@@ -0,0 +1,724 @@
+import threading
+
+from kivy.animation import Animation
+from kivy.clock import Clock
+from kivy.factory import Factory
+from kivy.lang import Builder
+from kivy.metrics import dp
+from kivy.uix.relativelayout import RelativeLayout
+from kivy.uix.label import Label
+from kivy.properties import StringProperty, NumericProperty, ListProperty, BooleanProperty
+
+from kivymd.uix.label import MDLabel
+from kivymd.uix.list import OneLineListItem
+from kivymd.uix.snackbar import Snackbar
+
+from spotify_controller import (
+    toggle_playback,
+    previous_song,
+    next_song,
+    toggle_like_current_song,
+    toggle_shuffle,
+    toggle_loop
+)
+from spotify_controller import get_library, play_context_by_url, context_uri, sp
+from search_index import LibrarySearchIndex
+from cover_cache import CoverCache
+from snapshot_poller import SnapshotPoller
+from ring_log import get_logger
+import theme
+
+log = get_logger(__name__)
+
+# Seconds between background refreshes of the cached library
+LIBRARY_SYNC_INTERVAL = 600
+
+# Cover grid layout: columns, cell height and rows of art prefetched
+# above and below the visible part of the grid
+GRID_COLUMNS = 3
+GRID_CELL_HEIGHT = 96
+GRID_PREFETCH_ROWS = 1
+
+# -----------------------------------
+# MarqueeLabel Implementation
+# -----------------------------------
+class MarqueeLabel(RelativeLayout):
+    text = StringProperty("")
+    font_size = NumericProperty("20sp")
+    text_color = ListProperty([0, 1, 0, 1])
+    delay = NumericProperty(2)  # seconds before starting marquee
+    speed = NumericProperty(30) # pixels per second
+    frozen = BooleanProperty(False)  # hold still, e.g. in power-save mode
+
+    def __init__(self, **kwargs):
+        super(MarqueeLabel, self).__init__(**kwargs)
+        self.label = Label(text=self.text,
+                           font_size=self.font_size,
+                           color=self.text_color,
+                           size_hint=(None, None))
+        self.add_widget(self.label)
+        self.bind(text=self._update_label,
+                  font_size=self._update_label,
+                  text_color=self._update_label,
+                  size=self._update_label)
+        Clock.schedule_once(self._start_marquee, self.delay)
+
+    def _update_label(self, *args):
+        self.label.text = self.text
+        self.label.font_size = self.font_size
+        self.label.color = self.text_color
+        self.label.texture_update()
+        self.label.width = self.label.texture_size[0]
+        self.label.height = self.height
+        self.label.x = self.width
+        Clock.unschedule(self._marquee_update)
+        if self.label.width > self.width:
+            if self.frozen:
+                self.label.x = 0
+            else:
+                Clock.schedule_interval(self._marquee_update, 1/30.0)
+        else:
+            self.label.x = (self.width - self.label.width) / 2
+
+    def on_size(self, *args):
+        self._update_label()
+
+    def on_frozen(self, instance, frozen):
+        Clock.unschedule(self._marquee_update)
+        if self.label.width > self.width:
+            if frozen:
+                self.label.x = 0
+            else:
+                Clock.schedule_interval(self._marquee_update, 1/30.0)
+
+    def _start_marquee(self, dt):
+        if self.label.width > self.width and not self.frozen:
+            Clock.schedule_interval(self._marquee_update, 1/30.0)
+
+    def _marquee_update(self, dt):
+        self.label.x -= self.speed * dt
+        if self.label.x < -self.label.width:
+            self.label.x = self.width
+
+# -----------------------------------
+# Shared KV rules
+# -----------------------------------
+# Rules only: every entry point instantiates what it needs from these.
+KV = '''
+#:import dp kivy.metrics.dp
+
+<LibraryOverlay@BoxLayout>:
+    orientation: "vertical"
+    canvas.before:
+        Color:
+            rgba: 0, 0, 0, 1
+        Rectangle:
+            pos: self.pos
+            size: self.size
+    MDBoxLayout:
+        size_hint_y: None
+        height: dp(20)
+        MDLabel:
+            text: "Your Library"
+            halign: "center"
+            font_style: "Subtitle1"
+            theme_text_color: "Custom"
+            text_color: 0, 1, 0, 1
+            padding: dp(2), dp(2)
+        MDIconButton:
+            id: grid_toggle
+            icon: "view-grid"
+            icon_size: "16sp"
+            theme_icon_color: "Custom"
+            icon_color: 0, 1, 0, 1
+            size_hint: None, None
+            size: dp(20), dp(20)
+            on_release: app.toggle_library_grid()
+    MDTextField:
+        id: library_search
+        hint_text: "Filter"
+        size_hint_y: None
+        height: dp(30)
+        font_size: "12sp"
+        on_text: app.on_library_filter(self.text)
+    ScrollView:
+        id: library_scroll
+        MDList:
+            id: library_list
+    RecycleView:
+        id: library_grid
+        viewclass: "CoverCell"
+        on_scroll_y: app.on_library_grid_scroll()
+        RecycleGridLayout:
+            cols: app.grid_columns
+            default_size: None, dp(app.grid_cell_height)
+            default_size_hint: 1, None
+            size_hint_y: None
+            height: self.minimum_height
+
+<CoverCell@ButtonBehavior+BoxLayout>:
+    text: ""
+    url: ""
+    cover_url: ""
+    cover_path: ""
+    orientation: "vertical"
+    padding: dp(3)
+    on_release: app.on_library_item_select(self.url)
+    Image:
+        source: root.cover_path
+        opacity: 1 if root.cover_path else 0
+        allow_stretch: True
+        keep_ratio: True
+        canvas.before:
+            Color:
+                rgba: 0, 0.25, 0, 1
+            Rectangle:
+                pos: self.pos
+                size: self.size
+    Label:
+        text: root.text
+        font_size: "10sp"
+        color: 0, 1, 0, 1
+        size_hint_y: None
+        height: dp(14)
+        text_size: self.width, None
+        halign: "center"
+        shorten: True
+
+<PlaySongPage@BoxLayout>:
+    orientation: "vertical"
+    padding: dp(10)
+    spacing: dp(5)
+    MDBoxLayout:
+        orientation: "vertical"
+        size_hint_y: 0.8
+        spacing: dp(5)
+        MDCard:
+            size_hint: None, None
+            size: root.width * 0.5, root.width * 0.5
+            pos_hint: {"center_x": 0.5}
+            elevation: app.card_elevation
+            radius: [dp(25),]
+            AsyncImage:
+                id: album_cover
+                source: ""
+                allow_stretch: True
+                keep_ratio: True
+        MarqueeLabel:
+            id: song_title
+            text: "Song Title"
+            font_size: "18sp"
+            size_hint_y: None
+            height: dp(25)
+        MarqueeLabel:
+            id: song_artist
+            text: "Artist"
+            font_size: "14sp"
+            size_hint_y: None
+            height: dp(20)
+        RelativeLayout:
+            size_hint_y: None
+            height: dp(40)
+            MDProgressBar:
+                id: progress_bar
+                pos_hint: {"center_y": 0.5}
+                size_hint_x: 1
+                value: 0
+                max: 100
+                color: 0, 1, 0, 1
+            ControlButton:
+                id: like_button
+                icon: "heart-outline"
+                size_hint: None, None
+                size: root.width * 0.09, root.width * 0.09
+                pos_hint: {"right": 1, "center_y": 0.5}
+                on_release: app.on_toggle_like()
+    MDBoxLayout:
+        orientation: "horizontal"
+        size_hint_y: None
+        height: root.width * 0.12
+        size_hint_x: None
+        width: self.minimum_width
+        pos_hint: {"center_x": 0.5}
+        spacing: dp(5)
+        padding: dp(5)
+        ControlButton:
+            id: shuffle_button
+            icon: "shuffle"
+            size_hint: None, None
+            size: root.width * 0.10, root.width * 0.10
+            on_release: app.on_toggle_shuffle()
+        ControlButton:
+            id: previous_button
+            icon: "skip-previous"
+            size_hint: None, None
+            size: root.width * 0.10, root.width * 0.10
+            on_release: app.on_previous()
+        ControlButton:
+            id: play_pause_button
+            icon: "play"
+            size_hint: None, None
+            size: root.width * 0.10, root.width * 0.10
+            on_release: app.on_play_pause()
+        ControlButton:
+            id: next_button
+            icon: "skip-next"
+            size_hint: None, None
+            size: root.width * 0.10, root.width * 0.10
+            on_release: app.on_next()
+        ControlButton:
+            id: loop_button
+            icon: "repeat"
+            size_hint: None, None
+            size: root.width * 0.10, root.width * 0.10
+            on_release: app.on_toggle_loop()
+'''
+
+_kv_loaded = None
+
+
+def load_kv():
+    """
+    Load the control button theme and the shared rules, once per process.
+
+    Returns:
+        True if the flat theme is in use.
+    """
+    global _kv_loaded
+    if _kv_loaded is None:
+        _kv_loaded = theme.use_flat_theme()
+        Builder.load_string(theme.control_button_kv(_kv_loaded))
+        Builder.load_string(KV)
+    return _kv_loaded
+
+
+# -----------------------------------
+# Lazily created overlays
+# -----------------------------------
+class OverlayStack:
+    """
+    Overlays that slide in over a layout, each built the first time it is
+    shown rather than at startup.
+
+    Args:
+        layout: The RelativeLayout the overlays are added to.
+        on_create: Optional callable run with (name, overlay) right after an
+            overlay is built, to finish setting it up.
+    """
+
+    def __init__(self, layout, on_create=None):
+        self.layout = layout
+        self.on_create = on_create
+        self._overlays = {}
+
+    def get(self, name):
+        """Return the overlay of KV class `name`, building it (hidden) if needed."""
+        overlay = self._overlays.get(name)
+        if overlay is None:
+            overlay = Factory.get(name)()
+            overlay.x = -self.layout.width
+            self.layout.add_widget(overlay)
+            self._overlays[name] = overlay
+            if self.on_create is not None:
+                self.on_create(name, overlay)
+        return overlay
+
+    def peek(self, name):
+        """Return the overlay if it has been built, without building it."""
+        return self._overlays.get(name)
+
+    def shown(self, name):
+        overlay = self._overlays.get(name)
+        return overlay is not None and overlay.x >= 0
+
+    def show(self, name):
+        overlay = self.get(name)
+        # Overlays stack in creation order; raise this one above the rest.
+        if self.layout.children[0] is not overlay:
+            self.layout.remove_widget(overlay)
+            self.layout.add_widget(overlay)
+        self._slide(overlay, True)
+
+    def hide(self, name):
+        overlay = self._overlays.get(name)
+        if overlay is not None:
+            self._slide(overlay, False)
+
+    def _slide(self, overlay, show):
+        Animation.cancel_all(overlay)
+        anim = Animation(x=0 if show else -overlay.width, duration=0.3)
+        anim.start(overlay)
+
+
+# -----------------------------------
+# Player page
+# -----------------------------------
+class PlayerPageMixin:
+    """
+    Player page behaviour for an MDApp: applies playback snapshots to
+    `self.player_page` (a PlaySongPage) and runs the transport controls.
+    """
+
+    def start_player(self, player_page):
+        self.player_page = player_page
+        self.current_track_id = None
+        self.poller = SnapshotPoller(
+            self.on_playback_snapshot, self.on_playback_error,
+            dispatch=lambda callback: Clock.schedule_once(lambda dt: callback(), 0))
+        self.poller.start()
+
+    def on_playback_snapshot(self, current, liked):
+        self.apply_playback(current, liked)
+
+    def on_playback_error(self, error):
+        pass
+
+    def apply_playback(self, current, liked):
+        """
+        Show a playback snapshot on the player page.
+
+        Returns:
+            True if the snapshot is for a different track than the last one.
+        """
+        psp = self.player_page
+        track_changed = False
+        if current and current.get("item"):
+            item = current["item"]
+            current_track_id = item.get("id")
+            if self.current_track_id != current_track_id:
+                self.current_track_id = current_track_id
+                track_changed = True
+                album_images = item.get("album", {}).get("images", [])
+                if album_images:
+                    cover_url = album_images[0]["url"]
+                    psp.ids.album_cover.source = cover_url
+                    psp.ids.album_cover.reload()
+                else:
+                    psp.ids.album_cover.source = ""
+            psp.ids.song_title.text = item.get("name", "Unknown Title")
+            artists = item.get("artists", [])
+            psp.ids.song_artist.text = ", ".join([a["name"] for a in artists])
+            duration_ms = item.get("duration_ms", 1)
+            progress_ms = current.get("progress_ms", 0)
+            percentage = (progress_ms / duration_ms) * 100
+            psp.ids.progress_bar.value = percentage
+            if current.get("is_playing"):
+                psp.ids.play_pause_button.icon = "pause"
+            else:
+                psp.ids.play_pause_button.icon = "play"
+            if liked is not None:
+                psp.ids.like_button.icon = "heart" if liked else "heart-outline"
+            repeat_state = current.get("repeat_state", "off")
+            if repeat_state != "off":
+                psp.ids.loop_button.icon = "repeat-variant"
+            else:
+                psp.ids.loop_button.icon = "repeat"
+            shuffle_state = current.get("shuffle_state", False)
+            if shuffle_state:
+                psp.ids.shuffle_button.icon = "shuffle-variant"
+            else:
+                psp.ids.shuffle_button.icon = "shuffle"
+        else:
+            track_changed = self.current_track_id is not None
+            self.current_track_id = None
+            psp.ids.song_title.text = "No song is playing"
+            psp.ids.song_artist.text = ""
+            psp.ids.album_cover.source = ""
+            psp.ids.progress_bar.value = 0
+            psp.ids.play_pause_button.icon = "play"
+            psp.ids.loop_button.icon = "repeat"
+            psp.ids.shuffle_button.icon = "shuffle"
+        return track_changed
+
+    def on_play_pause(self):
+        threading.Thread(target=self._play_pause_thread).start()
+
+    def _play_pause_thread(self):
+        try:
+            toggle_playback()
+        except Exception as e:
+            log.error("Error toggling playback: %s", e)
+
+    def on_previous(self):
+        threading.Thread(target=self._previous_thread).start()
+
+    def _previous_thread(self):
+        try:
+            previous_song()
+        except Exception as e:
+            log.error("Error going to previous song: %s", e)
+
+    def on_next(self):
+        threading.Thread(target=self._next_thread).start()
+
+    def _next_thread(self):
+        try:
+            next_song()
+        except Exception as e:
+            log.error("Error going to next song: %s", e)
+
+    def on_toggle_like(self):
+        threading.Thread(target=self._toggle_like_thread).start()
+
+    def _toggle_like_thread(self):
+        try:
+            toggle_like_current_song()
+        except Exception as e:
+            log.error("Error toggling like status: %s", e)
+        # Show the new state without waiting for the next regular poll.
+        self.poller.poll_now()
+
+    def on_toggle_shuffle(self):
+        threading.Thread(target=self._toggle_shuffle_thread).start()
+
+    def _toggle_shuffle_thread(self):
+        try:
+            toggle_shuffle()
+        except Exception as e:
+            log.error("Error toggling shuffle: %s", e)
+
+    def on_toggle_loop(self):
+        threading.Thread(target=self._toggle_loop_thread).start()
+
+    def _toggle_loop_thread(self):
+        try:
+            toggle_loop()
+        except Exception as e:
+            log.error("Error toggling loop: %s", e)
+
+
+# -----------------------------------
+# Library overlay
+# -----------------------------------
+class LibraryMixin:
+    """
+    The library overlay for an MDApp with an OverlayStack in `self.overlays`:
+    the cached library with its background sync, the filterable list, the
+    cover grid, and playback of the selected entry.
+    """
+    grid_columns = GRID_COLUMNS
+    grid_cell_height = GRID_CELL_HEIGHT
+
+    def start_library(self):
+        self.cached_playlists, self.cached_albums = {}, {}
+        self.library_details = {}
+        self.library_index = LibrarySearchIndex()
+        # The cover grid is only attached to the overlay while grid mode is on.
+        self.library_grid = None
+        self.grid_mode = False
+        self.cover_cache = None
+        self.grid_cover_rows = {}  # cover URL -> indices in the grid data
+        # Load in the background so the first frame does not wait on the API.
+        Clock.schedule_once(self.sync_library, 0)
+        Clock.schedule_interval(self.sync_library, LIBRARY_SYNC_INTERVAL)
+
+    def on_overlay_created(self, name, overlay):
+        if name == "LibraryOverlay":
+            self.library_grid = overlay.ids.library_grid
+            overlay.remove_widget(self.library_grid)
+
+    def sync_library(self, dt):
+        threading.Thread(target=self._sync_library_thread, daemon=True).start()
+
+    def _sync_library_thread(self):
+        """Fetch the library; returns its details, or None if that failed."""
+        details = {}
+        try:
+            playlists, albums = get_library(sp, details)
+        except Exception as e:
+            log.error("Error syncing library: %s", e)
+            return
+        # The index only re-indexes entries that actually changed.
+        self.library_index.update_library(playlists, albums)
+        Clock.schedule_once(lambda dt: self._apply_library_sync(playlists, albums, details), 0)
+        return details
+
+    def _apply_library_sync(self, playlists, albums, details):
+        self.cached_playlists, self.cached_albums = playlists, albums
+        self.library_details = details
+        if self.overlays.shown("LibraryOverlay"):
+            self.populate_library()
+
+    def toggle_library_overlay(self):
+        if not self.overlays.shown("LibraryOverlay"):
+            self.populate_library()
+            self.overlays.show("LibraryOverlay")
+        else:
+            if self.cover_cache is not None:
+                self.cover_cache.cancel_all()
+            self.overlays.hide("LibraryOverlay")
+
+    def populate_library(self):
+        if self.grid_mode:
+            self.populate_library_grid()
+        else:
+            self.populate_library_list()
+
+    def on_library_item_select(self, url):
+        self.play_context(url)
+        self.overlays.hide("LibraryOverlay")
+
+    def play_context(self, url, offset=None):
+        threading.Thread(target=self._play_context_thread, args=(url, offset),
+                         daemon=True).start()
+
+    def _play_context_thread(self, url, offset=None):
+        # Library entries carry their URI; anything else is converted here.
+        uri = (self.library_details.get(url) or {}).get("uri") or context_uri(url)
+        try:
+            result = play_context_by_url(sp, uri, offset=offset)
+        except Exception as e:
+            result = f"Error: {str(e)}"
+        Clock.schedule_once(lambda dt: self.show_snackbar(result), 0)
+
+    def show_snackbar(self, message):
+        Snackbar(text=message, duration=3).open()
+
+    # -----------------------------------
+    # List view
+    # -----------------------------------
+    def on_library_filter(self, text):
+        # Rebuild the list once typing pauses rather than on every keystroke.
+        Clock.unschedule(self._apply_library_filter)
+        Clock.schedule_once(self._apply_library_filter, 0.15)
+
+    def _apply_library_filter(self, dt):
+        self.populate_library()
+
+    def populate_library_list(self):
+        overlay = self.overlays.get("LibraryOverlay")
+        lib_list = overlay.ids.library_list
+        lib_list.clear_widgets()
+        query = overlay.ids.library_search.text
+        if query.strip():
+            self._populate_search_results(lib_list, query)
+            return
+        header = self._create_header("Playlists")
+        lib_list.add_widget(header)
+        for url, name in self.cached_playlists.items():
+            item = OneLineListItem(
+                text=name,
+                on_release=lambda inst, url=url: self.on_library_item_select(url)
+            )
+            lib_list.add_widget(item)
+        header = self._create_header("Albums")
+        lib_list.add_widget(header)
+        for url, name in self.cached_albums.items():
+            item = OneLineListItem(
+                text=name,
+                on_release=lambda inst, url=url: self.on_library_item_select(url)
+            )
+            item.theme_text_color = "Custom"
+            item.text_color = (0, 1, 0, 1)
+            lib_list.add_widget(item)
+
+    def _populate_search_results(self, lib_list, query):
+        results = self.library_index.search(query)
+        if not results:
+            lib_list.add_widget(self._create_header("No matches"))
+            return
+        for result in results:
+            item = OneLineListItem(
+                text=result.name if result.kind in ("playlist", "album")
+                else f"{result.name} ({result.kind})",
+                on_release=lambda inst, url=result.context: self.on_library_item_select(url)
+            )
+            if result.kind != "playlist":
+                item.theme_text_color = "Custom"
+                item.text_color = (0, 1, 0, 1)
+            lib_list.add_widget(item)
+
+    def _create_header(self, text):
+        return MDLabel(
+            text=text,
+            halign="center",
+            theme_text_color="Custom",
+            text_color=(0, 1, 0, 1),
+            bold=True,
+            size_hint_y=None,
+            height=20,
+            padding=(5, 5)
+        )
+
+    # -----------------------------------
+    # Cover grid
+    # -----------------------------------
+    def toggle_library_grid(self):
+        overlay = self.overlays.get("LibraryOverlay")
+        self.grid_mode = not self.grid_mode
+        if self.grid_mode:
+            if self.cover_cache is None:
+                self.cover_cache = CoverCache()
+            overlay.remove_widget(overlay.ids.library_scroll)
+            overlay.add_widget(self.library_grid)
+            overlay.ids.grid_toggle.icon = "view-list"
+        else:
+            self.cover_cache.cancel_all()
+            overlay.remove_widget(self.library_grid)
+            overlay.add_widget(overlay.ids.library_scroll)
+            overlay.ids.grid_toggle.icon = "view-grid"
+        self.populate_library()
+
+    def populate_library_grid(self):
+        query = self.overlays.get("LibraryOverlay").ids.library_search.text
+        if query.strip():
+            entries = [(r.context, r.name) for r in self.library_index.search(query)]
+        else:
+            entries = list(self.cached_playlists.items()) + list(self.cached_albums.items())
+        data = []
+        self.grid_cover_rows = {}
+        for url, name in entries:
+            cover_url = (self.library_details.get(url) or {}).get("image") or ""
+            cover_path = ""
+            if cover_url:
+                cover_path = self.cover_cache.path_for(cover_url) or ""
+                if not cover_path:
+                    self.grid_cover_rows.setdefault(cover_url, []).append(len(data))
+            data.append({"text": name, "url": url,
+                         "cover_url": cover_url, "cover_path": cover_path})
+        self.library_grid.data = data
+        self.library_grid.scroll_y = 1
+        # Wait for the layout to size itself before working out what is visible.
+        Clock.schedule_once(lambda dt: self.request_visible_covers(), 0)
+
+    def on_library_grid_scroll(self):
+        Clock.unschedule(self._request_visible_covers)
+        Clock.schedule_once(self._request_visible_covers, 0.1)
+
+    def _request_visible_covers(self, dt):
+        self.request_visible_covers()
+
+    def request_visible_covers(self):
+        """
+        Ask the cover cache for the art of the visible cells (plus a row of
+        margin), nearest to the middle of the viewport first. Anything that
+        scrolled out of range is cancelled before it is downloaded.
+        """
+        grid = self.library_grid
+        data = grid.data
+        if not self.grid_mode or not data:
+            return
+        row_height = dp(self.grid_cell_height)
+        content_height = row_height * ((len(data) + self.grid_columns - 1) // self.grid_columns)
+        top = (1 - grid.scroll_y) * max(content_height - grid.height, 0)
+        first_row = max(int(top // row_height) - GRID_PREFETCH_ROWS, 0)
+        last_row = int((top + grid.height) // row_height) + GRID_PREFETCH_ROWS
+        center_row = (top + grid.height / 2) / row_height
+        indices = range(first_row * self.grid_columns,
+                        min((last_row + 1) * self.grid_columns, len(data)))
+        wanted = []
+        for index in sorted(indices, key=lambda i: abs(i // self.grid_columns + 0.5 - center_row)):
+            row = data[index]
+            if row["cover_url"] and not row["cover_path"] and row["cover_url"] not in wanted:
+                wanted.append(row["cover_url"])
+        self.cover_cache.set_wanted(wanted, self._on_cover_downloaded)
+
+    def _on_cover_downloaded(self, cover_url, path):
+        Clock.schedule_once(lambda dt: self._show_cover(cover_url, path), 0)
+
+    def _show_cover(self, cover_url, path):
+        data = self.library_grid.data
+        for index in self.grid_cover_rows.pop(cover_url, []):
+            if index < len(data) and data[index]["cover_url"] == cover_url:
+                # Replacing a single row only refreshes that cell.
+                data[index] = dict(data[index], cover_path=path)